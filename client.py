@@ -1,12 +1,20 @@
-import clr
+import time
+
+# Начало запуска клиента - точка отсчета отчета о запуске
+PROCESS_STARTED = time.perf_counter()
+
 import os
 import sys
 import ctypes
 import json
 import asyncio
-from asyncua import Client, ua
-import time
 import hashlib
+import math
+import random
+import struct
+from array import array
+from datetime import datetime, timezone
+from urllib.parse import urlparse
 
 # Расширенный список типов оборудования для большей универсальности
 HARDWARE_TYPES = {
@@ -25,6 +33,42 @@ HARDWARE_TYPES = {
 
 UPDATE_INTERVAL = 10  # Интервал обновления в секундах
 
+# Флаги Computer, которые включают классы оборудования с датчиками температуры
+HARDWARE_CLASSES = {
+    'Mainboard': 'MainboardEnabled',
+    'SuperIO': 'MainboardEnabled',
+    'CPU': 'CPUEnabled',
+    'RAM': 'RAMEnabled',
+    'GpuNvidia': 'GPUEnabled',
+    'GpuAti': 'GPUEnabled',
+    'TBalancer': 'FanControllerEnabled',
+    'Heatmaster': 'FanControllerEnabled',
+    'HDD': 'HDDEnabled',
+    'SSD': 'HDDEnabled',
+}
+ALL_HARDWARE_CLASSES = ('MainboardEnabled', 'CPUEnabled', 'RAMEnabled', 'GPUEnabled', 'HDDEnabled')
+
+HARDWARE_CACHE_FILE = 'hardware_cache.json'
+HARDWARE_CACHE_MAX_AGE = 7 * 24 * 3600  # Полный опрос оборудования не реже раза в неделю
+UNBLOCK_MARKER_FILE = '.unblocked'
+# Повторный поиск датчиков раз в столько циклов: OpenHardwareMonitor включает часть
+# датчиков только при Update(), а устройства могут подключаться на ходу
+DISCOVERY_CYCLES = 30
+
+# Формат UDP датаграммы (должен совпадать с серверным): заголовок (магия, версия,
+# флаги, число записей), затем записи (NodeID датчика, время измерения UNIX, температура)
+UDP_MAGIC = b'TM'
+UDP_VERSION = 1
+UDP_HEADER = struct.Struct('<2sBBH')
+UDP_RECORD = struct.Struct('<Idd')
+UDP_RECORDS_PER_DATAGRAM = 64  # Датаграмма не превышает MTU
+
+# Формат снимка ПК (должен совпадать с серверным): заголовок (магия, версия, флаги,
+# число датчиков, время измерения UNIX), затем NodeID датчиков (uint32) и значения (float64)
+SNAPSHOT_MAGIC = b'TS'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<2sBBHd')
+
 def is_admin():
     try:
         return ctypes.windll.shell32.IsUserAnAdmin()
@@ -42,11 +86,12 @@ def run_as_admin():
             script_path = os.path.abspath(sys.argv[0])
             
             # Запускаем скрипт с правами администратора
+            arguments = " ".join(f'"{argument}"' for argument in [script_path] + sys.argv[1:])
             ctypes.windll.shell32.ShellExecuteW(
                 None, 
                 "runas", 
                 sys.executable, 
-                f'"{script_path}"', 
+                arguments, 
                 None, 
                 1
             )
@@ -56,15 +101,327 @@ def run_as_admin():
         return False
 
 
+class StartupTimer:
+    """Замер этапов запуска клиента. Этапы могут идти параллельно,
+    поэтому для каждого выводится начало от старта процесса и длительность"""
+    def __init__(self, started=PROCESS_STARTED):
+        self.started = started
+        self.phases = []  # [(начало, длительность, имя)]
+
+    def phase(self, name):
+        return _StartupPhase(self, name)
+
+    def report(self):
+        print("STARTUP: Этапы запуска (мс от старта процесса | мс длительность | этап)")
+        for start, duration, name in sorted(self.phases):
+            print(f"STARTUP: {start * 1000:9.1f} | {duration * 1000:9.1f} | {name}")
+        print(f"STARTUP: Готов к опросу через {(time.perf_counter() - self.started) * 1000:.1f} мс")
+
+
+class _StartupPhase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.began = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.phases.append((self.began - self.timer.started, time.perf_counter() - self.began, self.name))
+        return False
+
+
+class SensorBatch:
+    """Показания датчиков структурой массивов.
+    Метаданные датчиков хранятся один раз, в каждом цикле заполняются только значения и время."""
+    __slots__ = ('hardware', 'sensors', 'hardware_types', 'hardware_names', 'sensor_indexes',
+                 'sensor_names', 'values', 'selected', 'timestamp', 'version', 'cycles',
+                 'node_ids', 'node_key', 'nodes', 'nodes_key')
+
+    def __init__(self):
+        self.hardware = []  # Оборудование, обновляемое перед чтением значений
+        self.sensors = []  # Объекты датчиков OpenHardwareMonitor (None для готовых показаний)
+        self.hardware_types = []
+        self.hardware_names = []
+        self.sensor_indexes = []
+        self.sensor_names = []
+        self.values = array('d')
+        self.selected = bytearray()  # 1 - показание есть и выбрано к отправке
+        self.timestamp = 0.0  # Время чтения значений (UNIX)
+        self.version = 0  # Меняется при изменении состава датчиков
+        self.cycles = 0  # Циклов чтения с последнего поиска датчиков
+        # Кэши клиента для текущего состава: NodeID и узлы OPC UA
+        self.node_ids = None
+        self.node_key = None
+        self.nodes = None
+        self.nodes_key = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def add_sensor(self, sensor, hardware_type, hardware_name, sensor_index, sensor_name):
+        self.sensors.append(sensor)
+        self.hardware_types.append(hardware_type)
+        self.hardware_names.append(hardware_name)
+        self.sensor_indexes.append(sensor_index)
+        self.sensor_names.append(sensor_name)
+        self.values.append(math.nan)
+        self.selected.append(0)
+        self.version += 1
+        return len(self.values) - 1
+
+    def clear(self):
+        self.hardware.clear()
+        self.sensors.clear()
+        self.hardware_types.clear()
+        self.hardware_names.clear()
+        self.sensor_indexes.clear()
+        self.sensor_names.clear()
+        del self.values[:]
+        del self.selected[:]
+        self.version += 1
+
+    def selected_count(self):
+        return self.selected.count(1)
+
+    @classmethod
+    def from_records(cls, records, timestamp=None):
+        """Пакет из списка словарей в формате прежнего fetch_stats (для инструментов)"""
+        batch = cls()
+        for sensor_info in records:
+            k = batch.add_sensor(None, sensor_info['hardware_type'], sensor_info['hardware_name'],
+                                 sensor_info['sensor_index'], sensor_info['sensor_name'])
+            batch.values[k] = sensor_info['temperature']
+            batch.selected[k] = 1
+        batch.timestamp = time.time() if timestamp is None else timestamp
+        return batch
+
+
+class AdaptiveSampler:
+    """Адаптивный интервал отправки каждого датчика по скорости изменения температуры"""
+    def __init__(self, min_interval=1, max_interval=UPDATE_INTERVAL, min_change=0.5, window=10, growth=1.2,
+                 noise=1.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        # Границы из конфигурации: от них считается масштаб при смене интервала сервером
+        self.base_min_interval = min_interval
+        self.base_max_interval = max_interval
+        self.server_interval = max_interval
+        self.min_change = min_change  # Изменение (°C), которое хотим замечать за один интервал
+        self.window = window
+        self.growth = growth  # Во сколько раз интервал может вырасти за одно измерение
+        # Шум показаний (°C): OpenHardwareMonitor отдает многие температуры целыми градусами,
+        # поэтому скачки на один шаг квантования не считаются изменением
+        self.noise = noise
+        self.layout = None  # (пакет, версия состава), под который выделены массивы
+        self.keys = []  # Ключи датчиков (тип оборудования, индекс) для отчета
+        # Кольцевые буферы последних window измерений каждого датчика
+        self.times = []
+        self.temps = []
+        self.counts = array('l')
+        self.intervals = array('d')  # Выбранный интервал
+        self.logged = array('d')  # Интервал из последней строки RATE
+        self.last_sent = array('d')  # Время последней отправки (-1 - еще не отправлялся)
+
+    def _prepare(self, batch):
+        """Выделение массивов под состав датчиков пакета"""
+        if self.layout == (id(batch), batch.version):
+            return
+        old = dict(zip(self.keys, range(len(self.keys))))
+        keys = list(zip(batch.hardware_types, batch.sensor_indexes))
+        times, temps = [], []
+        counts, intervals, last_sent, logged = array('l'), array('d'), array('d'), array('d')
+        for key in keys:
+            k = old.get(key)
+            if k is None:
+                times.append(array('d', [0.0] * self.window))
+                temps.append(array('d', [0.0] * self.window))
+                counts.append(0)
+                intervals.append(self.min_interval)
+                last_sent.append(-1.0)
+                logged.append(self.min_interval)
+            else:
+                # Сохраняем историю датчиков, оставшихся после смены состава
+                times.append(self.times[k])
+                temps.append(self.temps[k])
+                counts.append(self.counts[k])
+                intervals.append(self.intervals[k])
+                last_sent.append(self.last_sent[k])
+                logged.append(self.logged[k])
+        self.keys, self.times, self.temps = keys, times, temps
+        self.counts, self.intervals, self.last_sent, self.logged = counts, intervals, last_sent, logged
+        self.layout = (id(batch), batch.version)
+
+    def set_max_interval(self, max_interval):
+        """Смена потолка интервала"""
+        self.max_interval = max(max_interval, self.min_interval)
+        for k in range(len(self.intervals)):
+            self.intervals[k] = min(max(self.intervals[k], self.min_interval), self.max_interval)
+
+    def set_server_interval(self, interval):
+        """Интервал, заданный сервером, становится потолком. Если сервер поднял его выше
+        базового (перегрузка), нижняя граница растет в той же пропорции - иначе быстро
+        меняющиеся датчики продолжали бы отправляться каждую секунду"""
+        self.server_interval = interval
+        scale = max(interval / self.base_max_interval, 1.0)
+        self.min_interval = min(self.base_min_interval * scale, interval)
+        self.set_max_interval(interval)
+
+    def choose_interval(self, k):
+        """Интервал, за который температура изменится примерно на min_change"""
+        n = min(self.counts[k], self.window)
+        if n < 2:
+            return self.min_interval
+        times = self.times[k]
+        temps = self.temps[k]
+
+        # Наклон по методу наименьших квадратов (°C/с) и разброс показаний.
+        # Порядок точек в кольце для этих сумм не важен
+        mean_t = 0.0
+        mean_v = 0.0
+        low = high = temps[0]
+        first = last = times[0]
+        for i in range(n):
+            mean_t += times[i]
+            mean_v += temps[i]
+            if temps[i] < low:
+                low = temps[i]
+            elif temps[i] > high:
+                high = temps[i]
+            if times[i] < first:
+                first = times[i]
+            elif times[i] > last:
+                last = times[i]
+        mean_t /= n
+        mean_v /= n
+        var_t = 0.0
+        cov = 0.0
+        for i in range(n):
+            var_t += (times[i] - mean_t) ** 2
+            cov += (times[i] - mean_t) * (temps[i] - mean_v)
+        slope = cov / var_t if var_t else 0.0
+        # Разброс в пределах +-noise, как и наклон, изменивший температуру за окно не больше
+        # этого, - дрожание показаний, а не изменение температуры
+        band = 2 * self.noise
+        if high - low <= band or abs(slope) * (last - first) <= band:
+            slope = 0.0
+
+        if high - low - band >= self.min_change * 4:
+            # Сильные колебания сверх шума - отправляем как можно чаще
+            target = self.min_interval
+        elif slope:
+            target = self.min_change / abs(slope)
+        else:
+            target = self.max_interval
+
+        # Сокращаем интервал сразу, увеличиваем постепенно
+        target = min(target, self.intervals[k] * self.growth)
+        return min(max(target, self.min_interval), self.max_interval)
+
+    def select_due(self, batch, now=None):
+        """Учет свежих показаний пакета. Снимает отметку selected с датчиков, которым
+        еще рано отправляться, и возвращает число датчиков к отправке"""
+        if now is None:
+            now = time.monotonic()
+        self._prepare(batch)
+
+        due = 0
+        selected = batch.selected
+        for k in range(len(selected)):
+            if not selected[k]:
+                continue
+            position = self.counts[k] % self.window
+            self.times[k][position] = now
+            self.temps[k][position] = batch.values[k]
+            self.counts[k] += 1
+
+            # Интервал пересчитывается на каждом измерении, поэтому рост температуры
+            # ускоряет отправку, не дожидаясь окончания длинного интервала
+            interval = self.choose_interval(k)
+            self.intervals[k] = interval
+            # В журнал - только заметная смена интервала (в 2 раза и больше)
+            if max(interval, self.logged[k]) >= 2 * min(interval, self.logged[k]):
+                print(f"RATE: {batch.hardware_types[k]} {batch.sensor_names[k]}: "
+                      f"интервал {interval:.1f} с ({1 / interval:.2f} Гц)")
+                self.logged[k] = interval
+
+            last = self.last_sent[k]
+            if last < 0 or now - last >= interval - self.min_interval / 2:
+                self.last_sent[k] = now
+                due += 1
+            else:
+                selected[k] = 0
+        return due
+
+    def rates(self):
+        """Выбранная частота отправки каждого датчика (Гц)"""
+        return {key: 1 / interval for key, interval in zip(self.keys, self.intervals)}
+
+
+class TargetIntervalHandler:
+    """Обработчик изменений целевого интервала опроса, публикуемого сервером"""
+    def __init__(self, opcua_client):
+        self.opcua_client = opcua_client
+
+    def datachange_notification(self, node, val, data):
+        self.opcua_client.set_update_interval(val)
+
+    def status_change_notification(self, status):
+        # Подписка закрывается сервером (например, при перезапуске) - она создается
+        # заново при переподключении, поэтому достаточно сообщения
+        if self.opcua_client.verbose:
+            print(f"INFO: Подписка на интервал опроса закрыта сервером: {status.Status}")
+
+
 class TemperatureOPCUAClient:
-    def __init__(self, config_path='config.json'):
-        self.config = self.load_config(config_path)
+    def __init__(self, config_path='config.json', config=None, verbose=True):
+        # Готовая конфигурация (например, из инструментов нагрузки) заменяет файл
+        self.config = config if config is not None else self.load_config(config_path)
+        self.verbose = verbose  # Вывод строки на каждый датчик и итога отправки
         self.client = None
+        # Событие потери связи будит фоновое переподключение
+        self.connection_lost = asyncio.Event()
         self.connected = False
-        self.reconnect_attempts = 0
-        self.max_reconnect_attempts = 5
+        self.reconnect_attempts = 0  # Неудачных попыток подряд (растет пауза)
+        self.supervisor_task = None
+        self.reconnect_log = []  # Время попыток переподключения (monotonic)
+        # Показания, снятые без связи: {node_id: (timestamp, value)}. Новые показания
+        # датчика заменяют старые, поэтому буфер ограничен числом датчиков
+        self.pending = {}
+        self.max_pending = self.config.get('monitoring', {}).get('max_buffered', 10000)
+        self.pending_dropped = 0
         self.nodes = {}
+        # Транспорт отправки: "opcua" (по умолчанию), "snapshot" (все показания ПК
+        # одной записью в узел снимка) или "udp"
+        self.transport = self.config['opcua_server'].get('transport', 'opcua')
+        self.udp_transport = None
+        # Интервал опроса может меняться сервером во время работы
+        self.update_interval = self.config.get('monitoring', {}).get('update_interval', UPDATE_INTERVAL)
+        self.interval_changed = asyncio.Event()
+        self.subscription = None
+        # Индекс пространства имен запрашивается один раз на сессию
+        self.namespace_idx = None
+        # Буферы отправки переиспользуются между циклами
+        self._send_nodes = []
+        self._send_values = []
+        self._udp_buffer = bytearray(UDP_HEADER.size + UDP_RECORDS_PER_DATAGRAM * UDP_RECORD.size)
+        self._snapshot_buffer = bytearray()
+        self._snapshot_values = array('d')
+        self._snapshot_key = None
         
+    @property
+    def connected(self):
+        return self._connected
+    
+    @connected.setter
+    def connected(self, value):
+        self._connected = value
+        if value:
+            self.connection_lost.clear()
+        else:
+            self.connection_lost.set()
+    
     def load_config(self, config_path):
         """Загрузка конфигурации из JSON файла"""
         try:
@@ -78,7 +435,10 @@ class TemperatureOPCUAClient:
                     "url": "opc.tcp://localhost:4840/freeopcua/server/",
                     "namespace": "http://university.temperature.monitoring",
                     "connection_timeout": 10,
-                    "reconnect_interval": 5
+                    "reconnect_interval": 5,
+                    "max_reconnect_interval": 60,
+                    "transport": "opcua",
+                    "udp_port": 4841
                 },
                 "location": {
                     "building_number": 1,
@@ -87,6 +447,8 @@ class TemperatureOPCUAClient:
                 },
                 "monitoring": {
                     "update_interval": 10,
+                    "min_interval": 1,
+                    "noise_floor": 1.0,
                     "min_temperature_change": 0.5,
                     "max_sensor_failures": 10
                 }
@@ -103,15 +465,41 @@ class TemperatureOPCUAClient:
         node_id = int(hash_hex, 16) % 1000000
         return node_id
     
+    def snapshot_node_name(self, building, room, pc):
+        """Строковый NodeID узла снимка ПК (должен совпадать с серверным)"""
+        return f"B{building}_R{room}_P{pc}_Snapshot"
+    
+    async def connect_udp(self):
+        """Подготовка UDP отправителя (без сессии и подтверждений)"""
+        try:
+            if self.udp_transport:
+                self.udp_transport.close()
+            
+            host = urlparse(self.config['opcua_server']['url']).hostname
+            port = self.config['opcua_server'].get('udp_port', 4841)
+            loop = asyncio.get_running_loop()
+            self.udp_transport, _ = await loop.create_datagram_endpoint(
+                asyncio.DatagramProtocol, remote_addr=(host, port)
+            )
+            self.connected = True
+            print(f"SUCCESS: UDP отправка на {host}:{port}")
+            return True
+            
+        except Exception as e:
+            self.connected = False
+            print(f"ERROR: Ошибка подготовки UDP отправки: {e}")
+            return False
+    
     async def connect(self):
-        """Подключение к OPC UA серверу с обработкой переподключения"""
+        """Одна попытка подключения к OPC UA серверу (повторы - в reconnect_supervisor)"""
+        if self.transport == 'udp':
+            return await self.connect_udp()
+        
         try:
-            if self.client:
-                try:
-                    await self.client.disconnect()
-                except:
-                    pass
-                    
+            await self.drop_session()
+            
+            # asyncua загружается при первом подключении, а не при запуске
+            from asyncua import Client
             self.client = Client(self.config['opcua_server']['url'])
             
             # Установка таймаутов
@@ -121,26 +509,113 @@ class TemperatureOPCUAClient:
             await self.client.connect()
             self.connected = True
             self.reconnect_attempts = 0
+            self.namespace_idx = None
             
             print(f"SUCCESS: Подключен к OPC UA серверу: {self.config['opcua_server']['url']}")
+            await self.subscribe_target_interval()
             return True
             
         except Exception as e:
             self.connected = False
             self.reconnect_attempts += 1
             print(f"ERROR: Ошибка подключения к OPC UA серверу (попытка {self.reconnect_attempts}): {e}")
-            
-            if self.reconnect_attempts < self.max_reconnect_attempts:
-                reconnect_interval = self.config['opcua_server'].get('reconnect_interval', 5)
-                print(f"INFO: Повторная попытка подключения через {reconnect_interval} секунд...")
-                await asyncio.sleep(reconnect_interval)
-                return await self.connect()
-            else:
-                print(f"CRITICAL: Превышено максимальное количество попыток подключения ({self.max_reconnect_attempts})")
-                return False
+            return False
+    
+    async def drop_session(self):
+        """Закрытие оборванной сессии, чтобы ее фоновые задачи не работали до переподключения"""
+        if self.client:
+            try:
+                await self.client.disconnect()
+            except:
+                pass
+            self.client = None
+    
+    def reconnect_delay(self):
+        """Пауза перед следующей попыткой: экспоненциальный рост с полным случайным разбросом"""
+        settings = self.config['opcua_server']
+        base = settings.get('reconnect_interval', 5)
+        cap = settings.get('max_reconnect_interval', 60)
+        ceiling = min(cap, base * 2 ** min(self.reconnect_attempts, 16))
+        if not settings.get('reconnect_jitter', True):
+            return ceiling
+        # Пауза равномерно от 0 до потолка: после перезапуска сервера ПК
+        # переподключаются вразнобой, а не все на одной сетке
+        return random.uniform(0, ceiling)
+    
+    async def reconnect_supervisor(self):
+        """Фоновое восстановление связи без ограничения числа попыток"""
+        while True:
+            await self.connection_lost.wait()
+            if self.transport != 'udp':
+                await self.drop_session()
+            delay = self.reconnect_delay()
+            if self.verbose:
+                print(f"INFO: Переподключение через {delay:.1f} с (попытка {self.reconnect_attempts + 1})")
+            await asyncio.sleep(delay)
+            if self.connected:
+                continue
+            self.reconnect_log.append(time.monotonic())
+            if await self.connect():
+                await self.flush_pending()
+    
+    def start_supervisor(self):
+        if self.supervisor_task is None:
+            self.supervisor_task = asyncio.create_task(self.reconnect_supervisor())
+        return self.supervisor_task
+    
+    async def subscribe_target_interval(self):
+        """Подписка на целевой интервал опроса, публикуемый сервером"""
+        try:
+            namespace_idx = await self.client.get_namespace_index(
+                self.config['opcua_server']['namespace']
+            )
+            self.namespace_idx = namespace_idx
+            node = await self.client.nodes.objects.get_child(
+                [f"{namespace_idx}:Diagnostics", f"{namespace_idx}:TargetInterval"]
+            )
+            self.subscription = await self.client.create_subscription(1000, TargetIntervalHandler(self))
+            await self.subscription.subscribe_data_change(node)
+            print("SUCCESS: Подписка на интервал опроса сервера")
+        except Exception as e:
+            # Старый сервер без узла интервала - работаем с интервалом из конфигурации
+            self.subscription = None
+            print(f"WARNING: Интервал опроса сервера недоступен: {e}")
+    
+    def set_update_interval(self, interval):
+        """Применение нового интервала опроса без перезапуска"""
+        try:
+            interval = float(interval)
+        except (TypeError, ValueError):
+            return
+        # min/max пропускают NaN, поэтому нечисловые значения отбрасываются отдельно
+        if not math.isfinite(interval):
+            return
+        interval = min(max(interval, 1), 3600)
+        if interval != self.update_interval:
+            print(f"RATE: Сервер установил интервал опроса {interval:.0f} секунд")
+            self.update_interval = interval
+            self.interval_changed.set()
+    
+    async def wait_update_interval(self, timeout=None):
+        """Ожидание следующего цикла (прерывается при смене интервала)"""
+        self.interval_changed.clear()
+        try:
+            await asyncio.wait_for(self.interval_changed.wait(), timeout=timeout or self.update_interval)
+        except asyncio.TimeoutError:
+            pass
     
     async def disconnect(self):
         """Отключение от OPC UA сервера"""
+        if self.supervisor_task:
+            self.supervisor_task.cancel()
+            self.supervisor_task = None
+        
+        if self.udp_transport:
+            self.udp_transport.close()
+            self.udp_transport = None
+            self.connected = False
+            return
+        
         if self.client and self.connected:
             try:
                 await self.client.disconnect()
@@ -149,55 +624,281 @@ class TemperatureOPCUAClient:
             except Exception as e:
                 print(f"WARNING: Ошибка при отключении: {e}")
     
-    async def send_temperature_data(self, sensor_data):
-        """Отправка данных температуры на сервер"""
+    def prepare_batch(self, batch):
+        """NodeID датчиков пакета (вычисляются один раз на состав датчиков и местоположение)"""
+        location = self.config['location']
+        building = location['building_number']
+        room = location['room_number']
+        pc = location['pc_number']
+        key = (batch.version, building, room, pc)
+        if batch.node_key != key:
+            batch.node_ids = [
+                self.generate_node_id(building, room, pc, hardware_type, sensor_index)
+                for hardware_type, sensor_index in zip(batch.hardware_types, batch.sensor_indexes)
+            ]
+            batch.node_key = key
+            batch.nodes_key = None
+        return batch.node_ids
+    
+    def encode_datagrams(self, batch):
+        """Упаковка выбранных показаний в UDP датаграммы.
+        Датаграммы собираются в общем буфере и действительны до следующей итерации"""
+        node_ids = self.prepare_batch(batch)
+        buffer = self._udp_buffer
+        timestamp = batch.timestamp
+        values = batch.values
+        selected = batch.selected
+        
+        count = 0
+        offset = UDP_HEADER.size
+        for k in range(len(selected)):
+            if not selected[k]:
+                continue
+            UDP_RECORD.pack_into(buffer, offset, node_ids[k], timestamp, values[k])
+            offset += UDP_RECORD.size
+            count += 1
+            if count == UDP_RECORDS_PER_DATAGRAM:
+                UDP_HEADER.pack_into(buffer, 0, UDP_MAGIC, UDP_VERSION, 0, count)
+                yield memoryview(buffer)[:offset]
+                count = 0
+                offset = UDP_HEADER.size
+        if count:
+            UDP_HEADER.pack_into(buffer, 0, UDP_MAGIC, UDP_VERSION, 0, count)
+            yield memoryview(buffer)[:offset]
+    
+    async def send_udp_data(self, batch):
+        """Отправка данных температуры UDP датаграммами"""
+        try:
+            # Транспорт копирует датаграмму, если не может отправить ее сразу
+            for datagram in self.encode_datagrams(batch):
+                self.udp_transport.sendto(datagram)
+        except Exception as e:
+            print(f"ERROR: Ошибка UDP отправки: {e}")
+            self.connected = False
+            return False
+        
+        if self.verbose:
+            print(f"RESULT: Отправлено по UDP {batch.selected_count()} показаний")
+        return True
+    
+    async def ensure_namespace(self):
+        """Получение индекса пространства имен (один раз на сессию)"""
+        if self.namespace_idx is None:
+            try:
+                self.namespace_idx = await self.client.get_namespace_index(
+                    self.config['opcua_server']['namespace']
+                )
+            except Exception as e:
+                print(f"ERROR: Ошибка получения пространства имен: {e}")
+                self.connected = False
+                return False
+        return True
+    
+    def buffer_batch(self, batch):
+        """Сохранение выбранных показаний пакета до восстановления связи"""
+        node_ids = self.prepare_batch(batch)
+        selected = batch.selected
+        for k in range(len(selected)):
+            if not selected[k]:
+                continue
+            if node_ids[k] not in self.pending and len(self.pending) >= self.max_pending:
+                self.pending_dropped += 1
+                continue
+            self.pending[node_ids[k]] = (batch.timestamp, batch.values[k])
+        if self.verbose:
+            print(f"INFO: Нет связи с сервером, в буфере показаний: {len(self.pending)}")
+    
+    def restore_pending(self, pending):
+        """Возврат неотправленных показаний (более новые не затираются)"""
+        for node_id, reading in pending.items():
+            if node_id not in self.pending:
+                self.pending[node_id] = reading
+    
+    async def flush_pending(self):
+        """Отправка показаний, накопленных без связи, с временем их измерения"""
+        if not self.pending or not self.connected:
+            return True
+        pending, self.pending = self.pending, {}
+        
+        try:
+            if self.transport == 'udp':
+                records = [(node_id, timestamp, value) for node_id, (timestamp, value) in pending.items()]
+                for start in range(0, len(records), UDP_RECORDS_PER_DATAGRAM):
+                    chunk = records[start:start + UDP_RECORDS_PER_DATAGRAM]
+                    self.udp_transport.sendto(
+                        UDP_HEADER.pack(UDP_MAGIC, UDP_VERSION, 0, len(chunk))
+                        + b''.join(UDP_RECORD.pack(*record) for record in chunk)
+                    )
+            else:
+                from asyncua import ua
+                if not await self.ensure_namespace():
+                    self.restore_pending(pending)
+                    return False
+                # Снимок несет одно время на ПК, поэтому накопленные показания
+                # отправляются по датчикам с собственным временем измерения
+                nodes = [self.client.get_node(ua.NodeId(node_id, self.namespace_idx)) for node_id in pending]
+                values = [
+                    ua.DataValue(
+                        ua.Variant(value, ua.VariantType.Double),
+                        SourceTimestamp=datetime.fromtimestamp(timestamp, timezone.utc)
+                    )
+                    for timestamp, value in pending.values()
+                ]
+                await self.client.write_values(nodes, values, raise_on_partial_error=False)
+        except Exception as e:
+            print(f"ERROR: Ошибка отправки накопленных показаний: {e}")
+            self.restore_pending(pending)
+            self.connected = False
+            return False
+        
+        print(f"SUCCESS: Отправлено накопленных без связи показаний: {len(pending)}")
+        return True
+    
+    async def submit(self, batch):
+        """Отправка пакета, а без связи - буферизация до переподключения"""
+        if self.connected and self.pending:
+            await self.flush_pending()
+        if self.connected:
+            if await self.send_temperature_data(batch):
+                return True
+            if self.connected:
+                # Ошибка записи без потери связи - буферизовать нечего
+                return False
+        self.buffer_batch(batch)
+        return False
+    
+    def encode_snapshot(self, batch):
+        """Упаковка всех показаний пакета в снимок ПК.
+        NodeID упаковываются один раз на состав датчиков, в цикле копируются только значения"""
+        node_ids = self.prepare_batch(batch)
+        count = len(node_ids)
+        ids_end = SNAPSHOT_HEADER.size + count * 4
+        if self._snapshot_key != batch.node_key:
+            packed_ids = array('I', node_ids)
+            if sys.byteorder == 'big':
+                packed_ids.byteswap()
+            self._snapshot_buffer = bytearray(ids_end + count * 8)
+            self._snapshot_buffer[SNAPSHOT_HEADER.size:ids_end] = packed_ids
+            self._snapshot_values = array('d', bytes(count * 8))
+            self._snapshot_key = batch.node_key
+        
+        # Датчики без показания или не выбранные к отправке передаются как NaN
+        values = self._snapshot_values
+        selected = batch.selected
+        for k in range(count):
+            values[k] = batch.values[k] if selected[k] else math.nan
+        if sys.byteorder == 'big':
+            values.byteswap()
+        
+        buffer = self._snapshot_buffer
+        SNAPSHOT_HEADER.pack_into(buffer, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, count, batch.timestamp)
+        buffer[ids_end:] = values
+        return bytes(buffer)
+    
+    async def send_snapshot_data(self, batch):
+        """Отправка всех показаний ПК одной записью в узел снимка"""
+        from asyncua import ua
+        location = self.config['location']
+        node = self.client.get_node(ua.NodeId(
+            self.snapshot_node_name(location['building_number'], location['room_number'], location['pc_number']),
+            self.namespace_idx
+        ))
+        data_value = ua.DataValue(
+            ua.Variant(self.encode_snapshot(batch), ua.VariantType.ByteString),
+            SourceTimestamp=datetime.fromtimestamp(batch.timestamp, timezone.utc)
+        )
+        try:
+            result = (await self.client.write_values([node], [data_value], raise_on_partial_error=False))[0]
+        except Exception as e:
+            print(f"ERROR: Ошибка отправки снимка: {e}")
+            self.connected = False
+            return False
+        
+        if result.value in (ua.StatusCodes.BadNodeIdUnknown, ua.StatusCodes.BadUserAccessDenied):
+            # Сервер без узлов снимков (asyncua отвечает на запись в несуществующий
+            # узел отказом в доступе) - отправляем по датчикам
+            print("WARNING: Сервер не поддерживает снимки ПК, переход на запись по датчикам")
+            self.transport = 'opcua'
+            return await self.send_temperature_data(batch)
+        if not result.is_good():
+            print(f"ERROR: Ошибка отправки снимка: {result.name}")
+            return False
+        
+        if self.verbose:
+            print(f"RESULT: Снимок ПК: {batch.selected_count()} показаний одной записью")
+        return True
+    
+    async def send_temperature_data(self, batch):
+        """Отправка выбранных показаний пакета на сервер"""
         if not self.connected:
             print("ERROR: Нет подключения к серверу")
             return False
-            
-        successful_sends = 0
-        failed_sends = 0
         
-        print(f"INFO: Обработка {len(sensor_data)} датчиков...")
+        if self.transport == 'udp':
+            return await self.send_udp_data(batch)
+        
+        total = batch.selected_count()
+        if self.verbose:
+            print(f"INFO: Обработка {total} датчиков...")
+        if not total:
+            return False
+        
+        if not await self.ensure_namespace():
+            return False
+        
+        from asyncua import ua
+        if self.transport == 'snapshot':
+            return await self.send_snapshot_data(batch)
         
-        # Получаем пространство имен
+        # Узлы создаются один раз на состав датчиков и сессию
+        node_ids = self.prepare_batch(batch)
+        nodes_key = (self.client, self.namespace_idx)
+        if batch.nodes_key != nodes_key:
+            batch.nodes = [self.client.get_node(ua.NodeId(node_id, self.namespace_idx)) for node_id in node_ids]
+            batch.nodes_key = nodes_key
+        
+        # Время снятия показаний передается серверу для учета задержки доставки
+        source_timestamp = datetime.fromtimestamp(batch.timestamp, timezone.utc)
+        nodes = self._send_nodes
+        values = self._send_values
+        nodes.clear()
+        values.clear()
+        selected = batch.selected
+        for k in range(len(selected)):
+            if selected[k]:
+                nodes.append(batch.nodes[k])
+                values.append(ua.DataValue(
+                    ua.Variant(batch.values[k], ua.VariantType.Double),
+                    SourceTimestamp=source_timestamp
+                ))
+        
+        # Все показания цикла - одним запросом записи
         try:
-            namespace_idx = await self.client.get_namespace_index(
-                self.config['opcua_server']['namespace']
-            )
+            results = await self.client.write_values(nodes, values, raise_on_partial_error=False)
         except Exception as e:
-            print(f"ERROR: Ошибка получения пространства имен: {e}")
+            print(f"ERROR: Ошибка отправки данных: {e}")
+            self.connected = False
             return False
         
-        building = self.config['location']['building_number']
-        room = self.config['location']['room_number']  
-        pc = self.config['location']['pc_number']
-        
-        for sensor_info in sensor_data:
-            try:
-                # Генерируем NodeID
-                node_id = self.generate_node_id(
-                    building, room, pc, 
-                    sensor_info['hardware_type'], 
-                    sensor_info['sensor_index']
-                )
-                
-                # Создаем NodeId объект
-                node = ua.NodeId(node_id, namespace_idx)
-                
-                # Получаем узел и записываем значение
-                var = self.client.get_node(node)
-                await var.write_value(sensor_info['temperature'])
-                
-                print(f"SUCCESS: {sensor_info['temperature']:.1f}°C -> {sensor_info['hardware_name']} {sensor_info['sensor_name']} (ID: {node_id})")
+        successful_sends = 0
+        failed_sends = 0
+        position = 0
+        for k in range(len(selected)):
+            if not selected[k]:
+                continue
+            result = results[position]
+            position += 1
+            if result.is_good():
                 successful_sends += 1
-                
-            except Exception as e:
-                print(f"ERROR: Ошибка отправки для {sensor_info['sensor_name']}: {e}")
+                if self.verbose:
+                    print(f"SUCCESS: {batch.values[k]:.1f}°C -> {batch.hardware_names[k]} {batch.sensor_names[k]} (ID: {node_ids[k]})")
+            else:
                 failed_sends += 1
+                print(f"ERROR: Ошибка отправки для {batch.sensor_names[k]}: {result.name}")
         
-        success_rate = (successful_sends / len(sensor_data)) * 100 if sensor_data else 0
-        print(f"RESULT: Итого: {successful_sends}/{len(sensor_data)} ({success_rate:.1f}%) успешно отправлено")
+        success_rate = (successful_sends / total) * 100
+        if self.verbose:
+            print(f"RESULT: Итого: {successful_sends}/{total} ({success_rate:.1f}%) успешно отправлено")
         
         # Если много ошибок, возможно проблема с подключением
         if failed_sends > successful_sends and failed_sends > 3:
@@ -206,20 +907,66 @@ class TemperatureOPCUAClient:
             
         return successful_sends > 0
 
+def file_signature(file_path):
+    """Размер и время изменения файла - по ним видно, что DLL заменили"""
+    stat = os.stat(file_path)
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
 def unblock_file(file_path):
-    """Разблокировка DLL файла в Windows"""
+    """Разблокировка DLL файла в Windows.
+    После успешной разблокировки рядом с DLL остается метка, и PowerShell больше не запускается"""
+    marker_path = os.path.join(os.path.dirname(file_path), UNBLOCK_MARKER_FILE)
     try:
+        signature = file_signature(file_path)
+        if os.path.exists(marker_path):
+            with open(marker_path, 'r', encoding='utf-8') as f:
+                if f.read().strip() == signature:
+                    return
+        
         if os.name == 'nt':  # Windows
             powershell_command = f'Unblock-File -Path "{file_path}"'
             result = os.system(f'powershell -Command "{powershell_command}"')
             if result != 0:
                 print(f"WARNING: Не удалось разблокировать файл {file_path}")
+                return
+            with open(marker_path, 'w', encoding='utf-8') as f:
+                f.write(signature)
     except Exception as e:
         print(f"WARNING: Ошибка при разблокировке файла: {e}")
 
-def initialize_openhardwaremonitor():
-    """Инициализация библиотеки OpenHardwareMonitor"""
+def load_hardware_cache(cache_path):
+    """Классы оборудования с датчиками температуры по прошлому запуску (None - нужен полный опрос)"""
     try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if time.time() - cache['probed_at'] > HARDWARE_CACHE_MAX_AGE:
+            return None
+        classes = [name for name in cache['classes'] if name in HARDWARE_CLASSES.values()]
+        return classes or None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def save_hardware_cache(cache_path, batch):
+    """Сохранение классов оборудования, в которых нашлись датчики температуры"""
+    classes = sorted({HARDWARE_CLASSES[hardware_type] for hardware_type in batch.hardware_types
+                      if hardware_type in HARDWARE_CLASSES})
+    if not classes:
+        return
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'classes': classes, 'probed_at': time.time()}, f, indent=4)
+    except OSError as e:
+        print(f"WARNING: Не удалось сохранить список оборудования: {e}")
+
+def initialize_openhardwaremonitor(enabled_classes=None, timer=None):
+    """Инициализация библиотеки OpenHardwareMonitor.
+    enabled_classes - включаемые классы оборудования (None - все)"""
+    timer = timer or StartupTimer()
+    try:
+        # pythonnet нужен только для доступа к датчикам
+        with timer.phase("import clr"):
+            import clr
+        
         file_path = rf'{os.getcwd()}\ohm\OpenHardwareMonitorLib.dll'
         
         # Проверяем существование файла
@@ -228,20 +975,20 @@ def initialize_openhardwaremonitor():
             print("INFO: Убедитесь что папка 'ohm' с библиотекой OpenHardwareMonitorLib.dll находится в текущей директории")
             return None
             
-        unblock_file(file_path)
-        clr.AddReference(file_path)
-        print("Библиотека успешно загружена")
-        
-        from OpenHardwareMonitor import Hardware
-        print("Модуль Hardware импортирован")
+        with timer.phase("Unblock-File"):
+            unblock_file(file_path)
+        with timer.phase("загрузка OpenHardwareMonitorLib"):
+            clr.AddReference(file_path)
+            print("Библиотека успешно загружена")
+            
+            from OpenHardwareMonitor import Hardware
+            print("Модуль Hardware импортирован")
 
         handle = Hardware.Computer()
-        handle.MainboardEnabled = True
-        handle.CPUEnabled = True
-        handle.RAMEnabled = True
-        handle.GPUEnabled = True
-        handle.HDDEnabled = True
-        handle.Open()
+        for name in enabled_classes or ALL_HARDWARE_CLASSES:
+            setattr(handle, name, True)
+        with timer.phase(f"Computer.Open ({', '.join(enabled_classes) if enabled_classes else 'все классы'})"):
+            handle.Open()
         
         print("SUCCESS: OpenHardwareMonitor инициализирован")
         return handle
@@ -251,59 +998,93 @@ def initialize_openhardwaremonitor():
         print(f"Тип ошибки: {type(e)}")
         return None
 
-def fetch_stats(handle):
-    """Получение данных с датчиков температуры"""
-    if not handle:
-        return []
+def discover_sensors(handle, batch):
+    """Поиск датчиков температуры. Повторяется раз в DISCOVERY_CYCLES циклов, между
+    поисками читаются только значения. Состав пакета (и его версия) меняется, только
+    если датчики или оборудование действительно изменились"""
+    hardware = []
+    found = []
+    for i in handle.Hardware:
+        if not batch.hardware:
+            i.Update()
+        hardware.append(i)
+        sensors = list(i.Sensors)
         
-    sensor_data = []
+        # Подчиненные устройства (например, отдельные ядра CPU)
+        for j in i.SubHardware:
+            if not batch.hardware:
+                j.Update()
+            hardware.append(j)
+            sensors.extend(j.Sensors)
+        
+        for sensor in sensors:
+            if str(sensor.SensorType) == 'Temperature':
+                hw_type_num = int(sensor.Hardware.HardwareType)
+                hw_type = HARDWARE_TYPES.get(hw_type_num, f'Unknown{hw_type_num}')
+                found.append((sensor, hw_type, sensor.Hardware.Name, sensor.Index, sensor.Name))
+    batch.cycles = 0
+    
+    current = list(zip(batch.hardware_types, batch.hardware_names, batch.sensor_indexes, batch.sensor_names))
+    if batch.hardware and current == [sensor[1:] for sensor in found]:
+        # Те же датчики - NodeID и кэши остаются, обновляются только объекты
+        batch.hardware[:] = hardware
+        for k, sensor in enumerate(found):
+            batch.sensors[k] = sensor[0]
+        return batch
+    
+    if batch.hardware:
+        print(f"INFO: Состав датчиков изменился: {len(current)} -> {len(found)}")
+    batch.clear()
+    batch.hardware.extend(hardware)
+    for sensor in found:
+        batch.add_sensor(*sensor)
+    return batch
+
+def fetch_stats(handle, batch=None, verbose=True):
+    """Получение данных с датчиков температуры в пакет (пакет переиспользуется между циклами)"""
+    if batch is None:
+        batch = SensorBatch()
+    if not handle:
+        return batch
     
     try:
-        for i in handle.Hardware:
-            i.Update()
-            
-            # Обработка основных датчиков
-            for sensor in i.Sensors:
-                if sensor.Value and str(sensor.SensorType) == 'Temperature':
-                    hw_type_num = int(sensor.Hardware.HardwareType)
-                    hw_type = HARDWARE_TYPES.get(hw_type_num, f'Unknown{hw_type_num}')
-                    
-                    sensor_info = {
-                        'hardware_type': hw_type,
-                        'hardware_name': sensor.Hardware.Name,
-                        'sensor_index': sensor.Index,
-                        'sensor_name': sensor.Name,
-                        'temperature': float(sensor.Value)
-                    }
-                    sensor_data.append(sensor_info)
-                    
-                    print(f"SENSOR: {hw_type} {sensor.Hardware.Name} - {sensor.Name}: {sensor.Value:.1f}°C")
-            
-            # Обработка подчиненных устройств (например, отдельные ядра CPU)
-            for j in i.SubHardware:
-                j.Update()
-                for subsensor in j.Sensors:
-                    if subsensor.Value and str(subsensor.SensorType) == 'Temperature':
-                        hw_type_num = int(subsensor.Hardware.HardwareType)
-                        hw_type = HARDWARE_TYPES.get(hw_type_num, f'Unknown{hw_type_num}')
-                        
-                        sensor_info = {
-                            'hardware_type': hw_type,
-                            'hardware_name': subsensor.Hardware.Name,
-                            'sensor_index': subsensor.Index,
-                            'sensor_name': subsensor.Name,
-                            'temperature': float(subsensor.Value)
-                        }
-                        sensor_data.append(sensor_info)
-                        
-                        print(f"SENSOR: {hw_type} {subsensor.Hardware.Name} - {subsensor.Name}: {subsensor.Value:.1f}°C")
+        if not batch.hardware or batch.cycles >= DISCOVERY_CYCLES:
+            discover_sensors(handle, batch)
+        batch.cycles += 1
+        
+        for hardware in batch.hardware:
+            hardware.Update()
+        # Время снятия показаний: после опроса оборудования значения датчиков уже не меняются
+        batch.timestamp = time.time()
+        
+        values = batch.values
+        selected = batch.selected
+        sensors = batch.sensors
+        for k in range(len(sensors)):
+            value = sensors[k].Value
+            if value:
+                values[k] = float(value)
+                selected[k] = 1
+                if verbose:
+                    print(f"SENSOR: {batch.hardware_types[k]} {batch.hardware_names[k]} - {batch.sensor_names[k]}: {value:.1f}°C")
+            else:
+                values[k] = math.nan
+                selected[k] = 0
     
     except Exception as e:
         print(f"ERROR: Ошибка при сборе данных с датчиков: {e}")
     
-    return sensor_data
+    return batch
+
+async def timed_connect(opcua_client, timer):
+    with timer.phase("подключение к серверу (с импортом asyncua)"):
+        return await opcua_client.connect()
 
 async def main():
+    startup_report = '--startup-report' in sys.argv[1:]
+    timer = StartupTimer()
+    timer.phases.append((0.0, time.perf_counter() - PROCESS_STARTED, "импорт модулей клиента"))
+    
     if not run_as_admin():
         print("Перезапуск с правами администратора...")
         sys.exit(0)
@@ -311,57 +1092,104 @@ async def main():
     print("STARTING: Запуск универсального клиента мониторинга температуры")
     print("=" * 60)
     
-    # Инициализация мониторинга оборудования
-    print("INIT: Инициализация мониторин")
-
-    hardware = initialize_openhardwaremonitor()
-    if not hardware:
-        print("CRITICAL: Не удалось инициализировать мониторинг оборудования")
-        return
-    
     # Инициализация OPC UA клиента
     print("INIT: Инициализация OPC UA клиента...")
     opcua_client = TemperatureOPCUAClient()
     
-    # Подключение к серверу
+    # Подключение к серверу идет параллельно с инициализацией оборудования.
+    # Без связи опрос все равно начинается, показания буферизуются,
+    # а подключение повторяется в фоне
     print("CONNECT: Подключение к OPC UA серверу...")
-    if not await opcua_client.connect():
-        print("CRITICAL: Не удалось подключиться к OPC UA серверу")
+    connect_task = asyncio.create_task(timed_connect(opcua_client, timer))
+    
+    # Инициализация мониторинга оборудования: только классы, в которых
+    # при прошлом запуске нашлись датчики температуры
+    print("INIT: Инициализация мониторинга оборудования...")
+    cache_path = opcua_client.config.get('monitoring', {}).get('hardware_cache', HARDWARE_CACHE_FILE)
+    enabled_classes = load_hardware_cache(cache_path)
+    with timer.phase("инициализация оборудования"):
+        # run_in_executor вместо asyncio.to_thread: клиент поддерживает Python 3.7
+        loop = asyncio.get_running_loop()
+        hardware = await loop.run_in_executor(None, initialize_openhardwaremonitor, enabled_classes, timer)
+    if not hardware:
+        print("CRITICAL: Не удалось инициализировать мониторинг оборудования")
+        connect_task.cancel()
+        await opcua_client.disconnect()
         return
     
+    # Первый опрос: при пустом результате по кэшу - полный опрос всех классов
+    with timer.phase("первый опрос датчиков"):
+        batch = fetch_stats(hardware)
+        if enabled_classes and not len(batch):
+            print("WARNING: По списку оборудования датчики не найдены, полный опрос...")
+            hardware.Close()
+            hardware = await loop.run_in_executor(None, initialize_openhardwaremonitor, None, timer)
+            if not hardware:
+                print("CRITICAL: Не удалось инициализировать мониторинг оборудования")
+                connect_task.cancel()
+                await opcua_client.disconnect()
+                return
+            batch = fetch_stats(hardware)
+            enabled_classes = None
+    if not enabled_classes:
+        save_hardware_cache(cache_path, batch)
+    
+    if not await connect_task:
+        print("WARNING: Сервер недоступен, подключение продолжится в фоне")
+    opcua_client.start_supervisor()
+    
+    if startup_report:
+        timer.report()
+    
+    # Интервал отправки каждого датчика подстраивается под скорость изменения температуры
+    monitoring = opcua_client.config.get('monitoring', {})
+    sampler = AdaptiveSampler(
+        min_interval=monitoring.get('min_interval', 1),
+        max_interval=opcua_client.update_interval,
+        min_change=monitoring.get('min_temperature_change', 0.5),
+        noise=monitoring.get('noise_floor', 1.0)
+    )
+    
     try:
         print("INFO: Начинаем мониторинг температуры...")
-        print(f"INFO: Интервал обновления: {UPDATE_INTERVAL} секунд")
+        print(f"INFO: Интервал обновления: {sampler.min_interval}-{opcua_client.update_interval} секунд")
         print("INFO: Для остановки нажмите Ctrl+C")
         print("=" * 60)
         
         iteration = 0
+        no_sensors = False  # Предупреждение об отсутствии датчиков уже выведено
         
         while True:
-            iteration += 1
-            print(f"\nITERATION: Цикл #{iteration} - {time.strftime('%H:%M:%S')}")
+            # Датчики читаются каждые min_interval секунд, поэтому цикл пишет в журнал
+            # только когда есть что отправить
+            batch = fetch_stats(hardware, batch, verbose=False)
+            found = batch.selected_count()
             
-            # Сбор данных с датчиков
-            print("COLLECT: Сбор данных с датчиков...")
-            sensor_data = fetch_stats(hardware)
+            # Потолок интервала (и при перегрузке - нижнюю границу) задает сервер
+            if sampler.server_interval != opcua_client.update_interval:
+                sampler.set_server_interval(opcua_client.update_interval)
+            due = sampler.select_due(batch)
             
-            if sensor_data:
-                print(f"INFO: Найдено {len(sensor_data)} датчиков температуры")
+            if due:
+                iteration += 1
+                print(f"\nITERATION: Отправка #{iteration} - {time.strftime('%H:%M:%S')}")
+                if opcua_client.verbose:
+                    for k in range(len(batch)):
+                        if batch.selected[k]:
+                            print(f"SENSOR: {batch.hardware_types[k]} {batch.hardware_names[k]} - "
+                                  f"{batch.sensor_names[k]}: {batch.values[k]:.1f}°C")
+                print(f"INFO: Найдено {found} датчиков температуры, к отправке {due}")
                 
-                # Отправка данных на сервер
+                # Отправка данных на сервер (без связи - в буфер до переподключения)
                 print("SEND: Отправка данных на OPC UA сервер...")
-                success = await opcua_client.send_temperature_data(sensor_data)
-                
-                if not success:
-                    print("WARNING: Ошибка отправки данных, попытка переподключения...")
-                    if not await opcua_client.connect():
-                        print("ERROR: Не удалось переподключиться к серверу")
-                        break
-            else:
+                if not await opcua_client.submit(batch) and opcua_client.connected:
+                    print("WARNING: Ошибка отправки данных")
+            elif not found and not no_sensors:
                 print("WARNING: Не найдено активных датчиков температуры")
+            no_sensors = not found
             
-            print(f"WAIT: Ожидание {UPDATE_INTERVAL} секунд до следующего обновления...")
-            await asyncio.sleep(UPDATE_INTERVAL)
+            # Датчики читаются с минимальным интервалом, отправляются - по своему
+            await opcua_client.wait_update_interval(sampler.min_interval)
             
     except KeyboardInterrupt:
         print("\n\nSTOP: Получен сигнал остановки от пользователя")
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from asyncua import Client, ua
+
+from server import decode_datagram, valid_reading
+
+DEFAULT_GATEWAY_CONFIG = {
+    "listen_host": "0.0.0.0",
+    "listen_port": 4841,
+    "flush_interval": 1.0,
+    "batch_size": 500,
+    "max_buffered": 20000
+}
+
+
+class GatewayProtocol(asyncio.DatagramProtocol):
+    """Прием UDP датаграмм от клиентов комнаты"""
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    def datagram_received(self, data, addr):
+        records = decode_datagram(data)
+        if records is None:
+            self.gateway.rejected += 1
+            return
+        self.gateway.buffer_records(records)
+
+
+class TemperatureGateway:
+    """Шлюз комнаты: принимает показания ПК и пересылает их на сервер одной сессией"""
+    def __init__(self, config_path='config.json'):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+        self.settings = dict(DEFAULT_GATEWAY_CONFIG, **self.config.get('gateway', {}))
+
+        self.client = None
+        self.connected = False
+        self.namespace_idx = None
+        self.transport = None
+        self.running = False
+
+        # Последнее значение каждого датчика: {node_id: (timestamp, value)}.
+        # Во время обрыва связи новые показания заменяют старые, поэтому буфер
+        # ограничен числом датчиков комнаты, а не длительностью обрыва
+        self.buffer = {}
+
+        self.received = 0
+        self.rejected = 0
+        self.invalid = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.forwarded = 0
+        self.write_errors = 0
+
+    def buffer_records(self, records):
+        """Буферизация показаний с объединением по датчику"""
+        max_buffered = self.settings['max_buffered']
+        now = time.time()
+        for node_id, timestamp, value in records:
+            self.received += 1
+            # То же правило, что и на сервере: NaN/inf и время вне окна не пересылаются
+            if not valid_reading(timestamp, value, now):
+                self.invalid += 1
+            elif node_id in self.buffer:
+                if timestamp >= self.buffer[node_id][0]:
+                    self.buffer[node_id] = (timestamp, value)
+                self.coalesced += 1
+            elif len(self.buffer) >= max_buffered:
+                self.dropped += 1
+            else:
+                self.buffer[node_id] = (timestamp, value)
+
+    async def listen(self):
+        """Запуск UDP приемника"""
+        loop = asyncio.get_running_loop()
+        host = self.settings['listen_host']
+        port = self.settings['listen_port']
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: GatewayProtocol(self), local_addr=(host, port)
+        )
+        print(f"SUCCESS: Шлюз принимает UDP: {host}:{port}")
+
+    async def connect_upstream(self):
+        """Подключение к центральному OPC UA серверу"""
+        try:
+            if self.client:
+                try:
+                    await self.client.disconnect()
+                except Exception:
+                    pass
+
+            self.client = Client(self.config['opcua_server']['url'])
+            timeout = self.config['opcua_server'].get('connection_timeout', 10)
+            self.client.session_timeout = timeout * 1000
+            await self.client.connect()
+            self.namespace_idx = await self.client.get_namespace_index(
+                self.config['opcua_server']['namespace']
+            )
+            self.connected = True
+            print(f"SUCCESS: Шлюз подключен к серверу: {self.config['opcua_server']['url']}")
+            return True
+
+        except Exception as e:
+            self.connected = False
+            print(f"ERROR: Ошибка подключения шлюза к серверу: {e}")
+            return False
+
+    def take_batch(self):
+        """Извлечение пакета показаний для отправки"""
+        batch_size = self.settings['batch_size']
+        if len(self.buffer) <= batch_size:
+            batch, self.buffer = self.buffer, {}
+        else:
+            batch = {}
+            for node_id in list(self.buffer)[:batch_size]:
+                batch[node_id] = self.buffer.pop(node_id)
+        return batch
+
+    def restore_batch(self, batch):
+        """Возврат неотправленного пакета в буфер (более новые показания не затираются)"""
+        for node_id, reading in batch.items():
+            if node_id not in self.buffer:
+                self.buffer[node_id] = reading
+
+    async def flush(self):
+        """Отправка накопленных показаний пакетными записями"""
+        while self.buffer and self.connected:
+            batch = self.take_batch()
+            try:
+                nodes = [self.client.get_node(ua.NodeId(node_id, self.namespace_idx)) for node_id in batch]
+                values = [
+                    ua.DataValue(
+                        ua.Variant(value, ua.VariantType.Double),
+                        SourceTimestamp=datetime.fromtimestamp(timestamp, timezone.utc)
+                    )
+                    for timestamp, value in batch.values()
+                ]
+                results = await self.client.write_values(nodes, values, raise_on_partial_error=False)
+            except Exception as e:
+                print(f"ERROR: Ошибка пересылки на сервер: {e}")
+                self.restore_batch(batch)
+                self.connected = False
+                return
+
+            for result in results:
+                if result.is_good():
+                    self.forwarded += 1
+                else:
+                    self.write_errors += 1
+
+    async def run(self):
+        """Основной цикл: пересылка буфера и переподключение с нарастающей паузой"""
+        self.running = True
+        backoff = self.config['opcua_server'].get('reconnect_interval', 5)
+        delay = backoff
+        last_report = time.monotonic()
+
+        while self.running:
+            if not self.connected:
+                if not await self.connect_upstream():
+                    print(f"INFO: Буферизовано датчиков: {len(self.buffer)}, повтор через {delay} с")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60)
+                    continue
+                delay = backoff
+
+            await self.flush()
+
+            if time.monotonic() - last_report >= 30:
+                last_report = time.monotonic()
+                print(f"STATUS: принято {self.received}, переслано {self.forwarded}, "
+                      f"объединено {self.coalesced}, отброшено {self.dropped}, некорректных {self.invalid}, "
+                      f"ошибок записи {self.write_errors}, в буфере {len(self.buffer)}")
+
+            await asyncio.sleep(self.settings['flush_interval'])
+
+    async def stop(self):
+        self.running = False
+        if self.transport:
+            self.transport.close()
+        if self.client and self.connected:
+            try:
+                await self.client.disconnect()
+            except Exception as e:
+                print(f"WARNING: Ошибка при отключении шлюза: {e}")
+        self.connected = False
+
+
+async def main():
+    logging.basicConfig(level=logging.WARNING)
+
+    gateway = TemperatureGateway()
+    try:
+        print("Запуск шлюза комнаты...")
+        await gateway.listen()
+        await gateway.run()
+    except KeyboardInterrupt:
+        print("\n\nПолучен сигнал остановки...")
+    finally:
+        print("Остановка шлюза...")
+        await gateway.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,563 @@
 import asyncio
+import bisect
+import inspect
+import itertools
+import json
 import logging
+import math
+import struct
+import sys
+import time
+from array import array
 from asyncua import Server, ua
-from datetime import datetime
+from asyncua.common.callback import CallbackType
+from datetime import datetime, timezone
+import argparse
 import hashlib
 
+# Состояния датчика по давности последней записи
+SENSOR_FRESH = 0
+SENSOR_UNCERTAIN = 1
+SENSOR_BAD = 2
+
+SENSOR_STATUS_CODES = {
+    SENSOR_FRESH: ua.StatusCodes.Good,
+    SENSOR_UNCERTAIN: ua.StatusCodes.UncertainLastUsableValue,
+    SENSOR_BAD: ua.StatusCodes.BadNoCommunication,
+}
+
+SENSOR_STATE_NAMES = {
+    SENSOR_FRESH: 'fresh',
+    SENSOR_UNCERTAIN: 'uncertain',
+    SENSOR_BAD: 'bad',
+}
+
+# Формат UDP датаграммы: заголовок (магия, версия, флаги, число записей),
+# затем записи (NodeID датчика, время измерения UNIX, температура)
+UDP_MAGIC = b'TM'
+UDP_VERSION = 1
+UDP_HEADER = struct.Struct('<2sBBH')
+UDP_RECORD = struct.Struct('<Idd')
+UDP_MAX_RECORDS = 1024
+
+# Насколько время измерения может опережать часы сервера (с). Время вне окна
+# (0, сейчас + MAX_CLOCK_AHEAD) не переводится в datetime и считается ошибкой
+MAX_CLOCK_AHEAD = 86400
+
+
+def valid_timestamp(timestamp, now=None):
+    """Проверка времени измерения UNIX, пришедшего от клиента"""
+    if now is None:
+        now = time.time()
+    return math.isfinite(timestamp) and 0 < timestamp < now + MAX_CLOCK_AHEAD
+
+
+def valid_reading(timestamp, value, now=None):
+    """Проверка показания (время измерения, температура), пришедшего от клиента"""
+    return math.isfinite(value) and valid_timestamp(timestamp, now)
+
+
+def decode_datagram(data):
+    """Разбор UDP датаграммы. Возвращает список (node_id, timestamp, value) или None"""
+    if len(data) < UDP_HEADER.size:
+        return None
+    magic, version, flags, count = UDP_HEADER.unpack_from(data)
+    if magic != UDP_MAGIC or version != UDP_VERSION or count > UDP_MAX_RECORDS:
+        return None
+    if len(data) != UDP_HEADER.size + count * UDP_RECORD.size:
+        return None
+    return list(UDP_RECORD.iter_unpack(memoryview(data)[UDP_HEADER.size:]))
+
+
+# Формат снимка ПК (ByteString): заголовок (магия, версия, флаги, число датчиков,
+# время измерения UNIX), затем NodeID всех датчиков (uint32), затем их значения (float64).
+# NaN - у датчика нет показания в этом цикле
+SNAPSHOT_MAGIC = b'TS'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<2sBBHd')
+SNAPSHOT_MAX_SENSORS = 4096
+
+
+def snapshot_node_name(building, room, pc):
+    """Строковый NodeID узла снимка ПК"""
+    return f"B{building}_R{room}_P{pc}_Snapshot"
+
+
+def decode_snapshot(data):
+    """Разбор снимка ПК. Возвращает (timestamp, node_ids, values) или None"""
+    if len(data) < SNAPSHOT_HEADER.size:
+        return None
+    magic, version, flags, count, timestamp = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or count > SNAPSHOT_MAX_SENSORS:
+        return None
+    if len(data) != SNAPSHOT_HEADER.size + count * 12 or not valid_timestamp(timestamp):
+        return None
+    # Оба столбца читаются целиком, без разбора по датчику
+    view = memoryview(data)
+    node_ids = array('I')
+    node_ids.frombytes(view[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + count * 4])
+    values = array('d')
+    values.frombytes(view[SNAPSHOT_HEADER.size + count * 4:])
+    if sys.byteorder == 'big':
+        node_ids.byteswap()
+        values.byteswap()
+    return timestamp, node_ids, values
+
+
+# Верхние границы корзин гистограммы задержек (с), последняя корзина - все, что больше
+LATENCY_BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30, 60, 300)
+
+
+def to_unix_time(dt):
+    """Перевод времени OPC UA (UTC) в секунды UNIX"""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class TimingWheel:
+    """Колесо таймеров: O(1) на постановку и отмену, O(истекших) на такт"""
+    def __init__(self, tick=1.0, horizon=64):
+        self.tick = tick
+        # Колесо длиннее максимальной задержки, поэтому в слоте лежат только истекшие ключи
+        self.size = int(horizon) + 1
+        self.slots = [{} for _ in range(self.size)]  # dict как упорядоченное множество ключей
+        self.slot_of = {}  # {key: индекс слота}
+        self.current_tick = int(time.monotonic() / tick)
+
+    def schedule(self, key, delay):
+        """Постановка (или перестановка) таймера ключа через delay секунд"""
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        if ticks >= self.size:
+            raise ValueError(f"Задержка {delay} с превышает горизонт колеса")
+        idx = (self.current_tick + ticks) % self.size
+        self.slots[idx][key] = None
+        self.slot_of[key] = idx
+
+    def cancel(self, key):
+        idx = self.slot_of.pop(key, None)
+        if idx is not None:
+            del self.slots[idx][key]
+
+    def advance(self, now=None):
+        """Продвижение колеса до момента now, возвращает истекшие ключи"""
+        if now is None:
+            now = time.monotonic()
+        target = int(now / self.tick)
+        # Пропущен больше чем полный оборот - достаточно обойти колесо один раз
+        if target - self.current_tick > self.size:
+            self.current_tick = target - self.size
+
+        expired = []
+        while self.current_tick < target:
+            self.current_tick += 1
+            idx = self.current_tick % self.size
+            slot = self.slots[idx]
+            if slot:
+                expired.extend(slot)
+                for key in slot:
+                    del self.slot_of[key]
+                self.slots[idx] = {}
+        return expired
+
+
+class LivenessMonitor:
+    """Отслеживание устаревших датчиков и отключившихся ПК"""
+    def __init__(self, expected_interval=10, uncertain_after=3, bad_after=6, tick=1.0, max_interval=None):
+        self.uncertain_after = uncertain_after
+        self.bad_after = bad_after
+        self.set_interval(expected_interval)
+        # Горизонт колеса рассчитан на самый длинный интервал опроса клиентов
+        longest = max(expected_interval, max_interval or expected_interval)
+        self.wheel = TimingWheel(tick, horizon=math.ceil(longest * bad_after / tick) + 1)
+        self.last_seen = {}  # {node_id: время последней записи (monotonic)}
+        self.state = {}  # {node_id: SENSOR_*}
+        self.offline_pcs = set()  # {(building, room, pc)}
+        self.pcs_changed = False  # Список ПК без связи изменился с прошлого такта
+
+    def set_interval(self, expected_interval):
+        """Смена ожидаемого интервала записей (действует для новых таймеров)"""
+        self.uncertain_delay = expected_interval * self.uncertain_after
+        self.bad_delay = expected_interval * self.bad_after
+
+    def touch(self, node_id, pc_key, now=None):
+        """Отметка записи датчика. Возвращает прежнее состояние датчика"""
+        self.last_seen[node_id] = time.monotonic() if now is None else now
+        previous = self.state.get(node_id)
+        self.state[node_id] = SENSOR_FRESH
+        self.wheel.schedule(('sensor', node_id), self.uncertain_delay)
+        self.wheel.schedule(('pc', pc_key), self.bad_delay)
+        if pc_key in self.offline_pcs:
+            self.offline_pcs.discard(pc_key)
+            self.pcs_changed = True
+        return previous
+
+    def tick(self, now=None):
+        """Обработка истекших таймеров. Возвращает ([(node_id, состояние)], изменился_ли_список_ПК)"""
+        transitions = []
+        for kind, key in self.wheel.advance(now):
+            if kind == 'pc':
+                self.offline_pcs.add(key)
+                self.pcs_changed = True
+            elif self.state.get(key) == SENSOR_FRESH:
+                self.state[key] = SENSOR_UNCERTAIN
+                self.wheel.schedule(('sensor', key), self.bad_delay - self.uncertain_delay)
+                transitions.append((key, SENSOR_UNCERTAIN))
+            elif self.state.get(key) == SENSOR_UNCERTAIN:
+                self.state[key] = SENSOR_BAD
+                transitions.append((key, SENSOR_BAD))
+        pcs_changed, self.pcs_changed = self.pcs_changed, False
+        return transitions, pcs_changed
+
+
+class LatencyHistogram:
+    """Потоковая гистограмма задержек с логарифмическими корзинами (память не растет с числом замеров)"""
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        self.bounds = bounds
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.negative = 0  # Время источника впереди сервера (расхождение часов)
+
+    def record(self, latency):
+        if latency < 0:
+            self.negative += 1
+            latency = 0.0
+        self.counts[bisect.bisect_left(self.bounds, latency)] += 1
+        self.count += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+
+    def quantile(self, q):
+        """Оценка квантиля сверху - граница корзины, в которую он попадает"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'max': self.max,
+            'negative': self.negative,
+        }
+
+
+class FleetSnapshot:
+    """Готовый к отдаче JSON снимок парка ПК: последние значения, состояние датчиков
+    и группировка по ПК. После записей пересериализуются только изменившиеся ПК"""
+    def __init__(self, node_info, liveness):
+        self.node_info = node_info
+        self.liveness = liveness
+        self.readings = {}  # {(здание, комната, ПК): {node_id: (value, source_ts, arrival)}}
+        self.fragments = {}  # {(здание, комната, ПК): JSON ПК в байтах}
+        self.dirty = set()  # ПК, изменившиеся с последней сборки
+        self.offline = set()  # ПК без связи на момент последней сборки
+        self.boot_id = int(time.time())  # ETag не повторяется после перезапуска сервера
+        self.version = 0
+        self.fragment_builds = 0
+        self.body = b''
+        self.etag = ''
+        self.response_head = b''
+        self.rebuild(force=True)
+
+    def pc_key(self, node_id):
+        info = self.node_info[node_id]
+        return (info['building'], info['room'], info['pc'])
+
+    def update(self, node_id, value, source_ts, arrival):
+        """Учет нового значения датчика"""
+        pc_key = self.pc_key(node_id)
+        readings = self.readings.get(pc_key)
+        if readings is None:
+            readings = self.readings[pc_key] = {}
+        readings[node_id] = (value, source_ts, arrival)
+        self.dirty.add(pc_key)
+
+    def mark(self, node_id):
+        """Пометка ПК датчика, у которого сменилось состояние"""
+        pc_key = self.pc_key(node_id)
+        if pc_key in self.readings:
+            self.dirty.add(pc_key)
+
+    def sync_offline(self):
+        """Пометка ПК, которые потеряли или восстановили связь"""
+        offline = set(self.liveness.offline_pcs)
+        self.dirty.update(pc_key for pc_key in offline ^ self.offline if pc_key in self.readings)
+        self.offline = offline
+
+    def _serialize_pc(self, pc_key):
+        building, room, pc = pc_key
+        sensors = []
+        updated_at = 0.0
+        for node_id, (value, source_ts, arrival) in self.readings[pc_key].items():
+            info = self.node_info[node_id]
+            sensors.append({
+                'node_id': node_id,
+                'name': info['display_name'],
+                'hardware_type': info['hardware_type'],
+                'hardware_name': info['hardware_name'],
+                'sensor_index': info['sensor_index'],
+                'sensor_name': info['sensor_name'],
+                # NaN в JSON недопустим: одно такое значение сломало бы разбор всего снимка
+                'value': value if math.isfinite(value) else None,
+                'source_time': source_ts,
+                'updated_at': arrival,
+                'state': SENSOR_STATE_NAMES[self.liveness.state.get(node_id, SENSOR_FRESH)],
+            })
+            updated_at = max(updated_at, arrival)
+        return json.dumps({
+            'building': building,
+            'room': room,
+            'pc': pc,
+            'offline': pc_key in self.offline,
+            'updated_at': updated_at,
+            'sensors': sensors,
+        }, separators=(',', ':'), ensure_ascii=False, allow_nan=False).encode('utf-8')
+
+    def rebuild(self, force=False):
+        """Сборка тела ответа и заголовков, если с прошлой сборки что-то изменилось"""
+        if not self.dirty and not force:
+            return False
+        for pc_key in self.dirty:
+            self.fragments[pc_key] = self._serialize_pc(pc_key)
+            self.fragment_builds += 1
+        self.dirty.clear()
+
+        self.version += 1
+        # Время сборки нужно клиенту, чтобы считать давность показаний без запроса каждую секунду
+        self.body = b''.join((
+            b'{"version":%d,"generated_at":%.3f,"pcs":[' % (self.version, time.time()),
+            b','.join(self.fragments[pc_key] for pc_key in sorted(self.fragments)),
+            b']}'
+        ))
+        self.etag = f'"{self.boot_id}-{self.version}"'
+        self.response_head = (
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(self.body)}\r\n"
+            f"ETag: {self.etag}\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            "\r\n"
+        ).encode('ascii')
+        return True
+
+
+class IngestQueue:
+    """Ограниченная очередь приема записей с объединением записей одного датчика"""
+    def __init__(self, max_pending=100000, batch_size=5000, batch_window=0.5):
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        # {node_id: (value, source_ts, arrival, apply)} - порядок вставки задает порядок обработки.
+        # apply - значение еще не записано в адресное пространство (пришло не через OPC UA)
+        self.pending = {}
+        self.consumers = []  # Потребители пакетов: история, агрегаты, тревоги, мониторинг
+        
+        # Метрики перегрузки
+        self.accepted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.max_depth = 0
+        self.peak_depth = 0  # Максимальная глубина с последнего сброса
+
+    def add_consumer(self, consumer):
+        """Регистрация потребителя: consumer(batch), обычная функция или корутина"""
+        self.consumers.append(consumer)
+
+    def put(self, node_id, value, source_ts=None, arrival=None, apply=False):
+        """Прием записи. Возвращает False, если очередь переполнена"""
+        if arrival is None:
+            arrival = time.time()
+        if node_id in self.pending:
+            # Более новое значение заменяет необработанное, позиция в очереди сохраняется.
+            # apply берется только от новой записи: значение, записанное через OPC UA, уже
+            # в адресном пространстве, а вытесненное UDP показание записывать не нужно
+            self.pending[node_id] = (value, source_ts, arrival, apply)
+            self.coalesced += 1
+            return True
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+        self.pending[node_id] = (value, source_ts, arrival, apply)
+        self.accepted += 1
+        if len(self.pending) > self.peak_depth:
+            self.peak_depth = len(self.pending)
+            if self.peak_depth > self.max_depth:
+                self.max_depth = self.peak_depth
+        return True
+
+    def reset_peak_depth(self):
+        """Возвращает максимальную глубину очереди с прошлого вызова"""
+        peak, self.peak_depth = self.peak_depth, len(self.pending)
+        return peak
+
+    def take_batch(self):
+        """Извлечение очередного пакета (не больше batch_size записей)"""
+        if len(self.pending) <= self.batch_size:
+            batch, self.pending = self.pending, {}
+        else:
+            batch = {}
+            for node_id in list(itertools.islice(self.pending, self.batch_size)):
+                batch[node_id] = self.pending.pop(node_id)
+        return batch
+
+    async def dispatch(self, batch):
+        """Передача пакета всем потребителям"""
+        for consumer in self.consumers:
+            try:
+                result = consumer(batch)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"ERROR: Ошибка обработки пакета записей: {e}")
+        self.batches += 1
+        self.last_batch_size = len(batch)
+
+    def metrics(self):
+        return {
+            'depth': len(self.pending),
+            'max_depth': self.max_depth,
+            'accepted': self.accepted,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'last_batch_size': self.last_batch_size,
+        }
+
+
+class RateController:
+    """Целевой интервал опроса клиентов по нагрузке сервера"""
+    def __init__(self, base_interval=10, max_interval=120, queue_threshold=50000, lag_threshold=0.5,
+                 relax_after=3):
+        self.base_interval = base_interval  # Интервал без перегрузки (задается оператором)
+        self.max_interval = max_interval
+        self.queue_threshold = queue_threshold
+        self.lag_threshold = lag_threshold
+        self.relax_after = relax_after  # Число спокойных проверок перед ускорением
+        self.interval = base_interval
+        self.calm_checks = 0
+
+    def set_base_interval(self, interval):
+        """Новый базовый интервал применяется сразу, при перегрузке он снова будет увеличен.
+        Возвращает False, если значение не является положительным конечным числом"""
+        if not math.isfinite(interval) or interval <= 0:
+            return False
+        self.base_interval = min(max(interval, 1), self.max_interval)
+        self.interval = self.base_interval
+        self.calm_checks = 0
+        return True
+
+    def update(self, queue_depth, loop_lag):
+        """Пересчет интервала. Возвращает True, если интервал изменился"""
+        previous = self.interval
+        if queue_depth > self.queue_threshold or loop_lag > self.lag_threshold:
+            # Перегрузка - клиенты опрашивают датчики реже
+            self.interval = min(self.interval * 2, self.max_interval)
+            self.calm_checks = 0
+        elif queue_depth < self.queue_threshold / 2 and loop_lag < self.lag_threshold / 2:
+            self.calm_checks += 1
+            if self.interval > self.base_interval and self.calm_checks >= self.relax_after:
+                self.interval = max(self.interval / 2, self.base_interval)
+                self.calm_checks = 0
+        else:
+            self.calm_checks = 0
+        return self.interval != previous
+
+
+class UdpIngestProtocol(asyncio.DatagramProtocol):
+    """Прием компактных UDP датаграмм с показаниями датчиков"""
+    def __init__(self, server):
+        self.server = server
+        self.datagrams = 0
+        self.rejected = 0
+
+    def datagram_received(self, data, addr):
+        records = decode_datagram(data)
+        if records is None:
+            self.rejected += 1
+            return
+        self.datagrams += 1
+        self.server.ingest_records(records)
+
+
 class TemperatureOPCUAServer:
-    def __init__(self, endpoint="opc.tcp://0.0.0.0:4840/freeopcua/server/"):
+    def __init__(self, endpoint="opc.tcp://0.0.0.0:4840/freeopcua/server/",
+                 expected_interval=10, uncertain_after=3, bad_after=6,
+                 udp_host="0.0.0.0", udp_port=None, max_interval=120,
+                 http_host="0.0.0.0", http_port=None):
         self.server = Server()
         self.endpoint = endpoint
         self.namespace = "http://university.temperature.monitoring"
         self.nodes = {}  # Хранилище созданных узлов: {node_id: node_object}
         self.node_info = {}  # Информация о узлах: {node_id: {metadata}}
         self.is_started = False
+        # Датчик становится Uncertain/Bad после указанного числа пропущенных интервалов
+        self.liveness = LivenessMonitor(expected_interval, uncertain_after, bad_after,
+                                        max_interval=max_interval)
+        # Целевой интервал опроса, публикуемый клиентам
+        self.rate = RateController(expected_interval, max_interval)
+        # Записи клиентов подтверждаются сразу, а потребителям передаются пакетами
+        self.ingest = IngestQueue()
+        self.ingest.add_consumer(self._address_space_consumer)
+        self.ingest.add_consumer(self._liveness_consumer)
+        self.ingest.add_consumer(self._change_consumer)
+        # Снимок для HTTP обновляется после учета активности, чтобы состояние было свежим
+        self.snapshot = FleetSnapshot(self.node_info, self.liveness)
+        self.ingest.add_consumer(self._snapshot_consumer)
+        self.changed_values = {}  # {node_id: value} - изменения для монитора
+        self.metric_nodes = {}  # {имя метрики: узел}
+        
+        # Необязательный прием показаний по UDP (udp_port=None - выключен)
+        self.udp_host = udp_host
+        self.udp_port = udp_port
+        self.udp_transport = None
+        self.udp_protocol = None
+        self.udp_unknown_sensors = 0
+        self.udp_invalid_values = 0
+        self.address_space_errors = 0
+        self.opcua_invalid_values = 0
+        
+        # Необязательный HTTP API снимка для панелей мониторинга (http_port=None - выключен)
+        self.http_host = http_host
+        self.http_port = http_port
+        self.http_server = None
+        self.http_requests = 0
+        self.http_not_modified = 0
+        
+        # Узлы снимков ПК: {строковый NodeID: (здание, комната, ПК)}
+        self.snapshot_nodes = {}
+        self.snapshot_writes = 0
+        self.snapshot_rejected = 0
+        self.snapshot_unknown_sensors = 0
+        
+        # Задержка от снятия показания клиентом до приема сервером: гистограммы
+        # за текущее окно (общая и по ПК) и общая за все время работы
+        self.latency = LatencyHistogram()
+        self.latency_total = LatencyHistogram()
+        self.pc_latency = {}  # {(здание, комната, ПК): LatencyHistogram}
+        self.latency_nodes = {}  # {имя: узел} общих показателей
+        self.pc_latency_nodes = {}  # {(здание, комната, ПК): {имя: узел}}
         
     async def initialize(self):
         """Инициализация сервера"""
@@ -35,6 +581,67 @@ class TemperatureOPCUAServer:
             self.namespace_idx, "TemperatureSensors"
         )
         
+        # Служебные переменные состояния парка ПК
+        self.diagnostics_root = await root_node.add_object(
+            self.namespace_idx, "Diagnostics"
+        )
+        self.offline_pcs_node = await self.diagnostics_root.add_variable(
+            self.namespace_idx, "OfflinePCs", 0, ua.VariantType.UInt32
+        )
+        self.target_interval_node = await self.diagnostics_root.add_variable(
+            self.namespace_idx, "TargetInterval", float(self.rate.interval), ua.VariantType.Double
+        )
+        # Оператор может задать базовый интервал записью в узел
+        await self.target_interval_node.set_writable(True)
+        for name, metric in (
+            ("IngestQueueDepth", 'depth'),
+            ("IngestMaxQueueDepth", 'max_depth'),
+            ("IngestAccepted", 'accepted'),
+            ("IngestCoalesced", 'coalesced'),
+            ("IngestDropped", 'dropped'),
+            ("IngestBatches", 'batches'),
+            ("IngestLastBatchSize", 'last_batch_size'),
+            ("UdpDatagrams", 'udp_datagrams'),
+            ("UdpRejectedDatagrams", 'udp_rejected'),
+            ("UdpUnknownSensors", 'udp_unknown_sensors'),
+            ("UdpInvalidValues", 'udp_invalid_values'),
+            ("AddressSpaceErrors", 'address_space_errors'),
+            ("OpcuaInvalidValues", 'opcua_invalid_values'),
+            ("SnapshotWrites", 'snapshot_writes'),
+            ("SnapshotRejected", 'snapshot_rejected'),
+            ("SnapshotUnknownSensors", 'snapshot_unknown_sensors'),
+            ("HttpRequests", 'http_requests'),
+            ("HttpNotModified", 'http_not_modified'),
+        ):
+            self.metric_nodes[metric] = await self.diagnostics_root.add_variable(
+                self.namespace_idx, name, 0, ua.VariantType.UInt64
+            )
+        
+        # Задержка доставки показаний: квантили за последнее окно и корзины за все время
+        self.latency_root = await self.diagnostics_root.add_object(self.namespace_idx, "Latency")
+        for name, variant_type in (
+            ("Count", ua.VariantType.UInt64),
+            ("MeanMs", ua.VariantType.Double),
+            ("P50Ms", ua.VariantType.Double),
+            ("P95Ms", ua.VariantType.Double),
+            ("P99Ms", ua.VariantType.Double),
+            ("MaxMs", ua.VariantType.Double),
+            ("ClockSkewed", ua.VariantType.UInt64),
+        ):
+            self.latency_nodes[name] = await self.latency_root.add_variable(
+                self.namespace_idx, name, ua.Variant(0, variant_type)
+            )
+        await self.latency_root.add_variable(
+            self.namespace_idx, "BucketBoundsMs",
+            ua.Variant([bound * 1000.0 for bound in LATENCY_BOUNDS], ua.VariantType.Double)
+        )
+        self.latency_nodes["Buckets"] = await self.latency_root.add_variable(
+            self.namespace_idx, "Buckets", ua.Variant([0] * (len(LATENCY_BOUNDS) + 1), ua.VariantType.UInt64)
+        )
+        
+        # Отслеживаем записи клиентов для контроля активности датчиков
+        self.server.subscribe_server_callback(CallbackType.PostWrite, self._on_post_write)
+        
         # ВАЖНО: Регистрируем обработчик для динамического создания узлов
         await self._setup_dynamic_node_creation()
         
@@ -89,6 +696,8 @@ class TemperatureOPCUAServer:
             ("SSD", 1, "Temperature"),
         ]
         
+        await self._ensure_snapshot_node(building, room, pc)
+        
         for hw_type, sensor_idx, sensor_name in typical_sensors:
             node_id, _ = self.generate_node_id(building, room, pc, hw_type, sensor_idx)
             
@@ -130,6 +739,23 @@ class TemperatureOPCUAServer:
         node_id = int(hash_hex, 16) % 1000000  # Ограничиваем размер числа
         
         return node_id, base_string
+    
+    async def _ensure_snapshot_node(self, building, room, pc):
+        """Создание узла снимка ПК, в который клиент пишет все показания цикла одной записью"""
+        name = snapshot_node_name(building, room, pc)
+        if name in self.snapshot_nodes:
+            return
+        try:
+            node = await self.sensors_root.add_variable(
+                ua.NodeId(name, self.namespace_idx),
+                name,
+                b'',
+                ua.VariantType.ByteString
+            )
+            await node.set_writable(True)
+            self.snapshot_nodes[name] = (building, room, pc)
+        except Exception as e:
+            print(f"ERROR: Ошибка создания узла снимка {name}: {e}")
         
     async def create_sensor_node(self, building, room, pc, hardware_type, hardware_name, sensor_index, sensor_name):
         """Динамическое создание узла датчика"""
@@ -143,6 +769,8 @@ class TemperatureOPCUAServer:
             return self.nodes[node_id]
             
         try:
+            await self._ensure_snapshot_node(building, room, pc)
+            
             # Создаем переменную для температуры напрямую в корневом объекте датчиков
             display_name = f"B{building}_R{room}_P{pc}_{hardware_type}_{sensor_index}"
             
@@ -200,6 +828,18 @@ class TemperatureOPCUAServer:
             print(f"SUCCESS: Пространство имен: {self.namespace}")
             print(f"SUCCESS: Режим работы: динамическое создание узлов")
             print(f"INFO: Предварительно создано узлов: {len(self.nodes)}")
+            
+            if self.udp_port is not None:
+                loop = asyncio.get_running_loop()
+                self.udp_transport, self.udp_protocol = await loop.create_datagram_endpoint(
+                    lambda: UdpIngestProtocol(self),
+                    local_addr=(self.udp_host, self.udp_port)
+                )
+                print(f"SUCCESS: Прием UDP: {self.udp_host}:{self.udp_port}")
+            
+            if self.http_port is not None:
+                await self.start_http()
+
             print(f"INFO: Поддерживаемые конфигурации:")
             print(f"      - Здания: 1-4")
             print(f"      - Комнаты: 100-109")
@@ -212,6 +852,12 @@ class TemperatureOPCUAServer:
     
     async def stop(self):
         """Остановка сервера"""
+        if self.http_server:
+            self.http_server.close()
+            self.http_server = None
+        if self.udp_transport:
+            self.udp_transport.close()
+            self.udp_transport = None
         if self.is_started and self.server:
             try:
                 await self.server.stop()
@@ -233,6 +879,368 @@ class TemperatureOPCUAServer:
             print(f"ERROR: Ошибка обновления температуры: {e}")
             return False
     
+    async def _on_post_write(self, event, dispatcher):
+        """Обработчик успешных записей в узлы датчиков"""
+        arrival = time.time()
+        for write_value, status in zip(event.request_params.NodesToWrite, event.response_params):
+            if write_value.AttributeId != ua.AttributeIds.Value or not status.is_good():
+                continue
+            if write_value.NodeId == self.target_interval_node.nodeid:
+                # Узел доступен на запись любой сессии: некорректное значение отбрасывается,
+                # в узел в любом случае возвращается действующий (ограниченный) интервал
+                try:
+                    interval = float(write_value.Value.Value.Value)
+                except (TypeError, ValueError):
+                    interval = math.nan
+                if not self.rate.set_base_interval(interval):
+                    print(f"WARNING: Отклонен интервал опроса: {write_value.Value.Value.Value}")
+                await self._publish_interval()
+                continue
+            if write_value.NodeId.NamespaceIndex != self.namespace_idx:
+                continue
+            node_id = write_value.NodeId.Identifier
+            if node_id in self.node_info:
+                data_value = write_value.Value
+                value = data_value.Value.Value
+                # Как и для UDP и снимков: NaN/inf не передаются дальше в монитор и снимок
+                if not isinstance(value, (int, float)) or not math.isfinite(value):
+                    self.opcua_invalid_values += 1
+                    continue
+                source_ts = to_unix_time(data_value.SourceTimestamp)
+                if source_ts is not None:
+                    info = self.node_info[node_id]
+                    self.record_latency((info['building'], info['room'], info['pc']), arrival - source_ts)
+                self.ingest.put(node_id, value, source_ts, arrival)
+            elif node_id in self.snapshot_nodes:
+                self.ingest_snapshot(write_value.Value.Value.Value, self.snapshot_nodes[node_id], arrival)
+    
+    def record_latency(self, pc_key, latency):
+        """Учет задержки показания от снятия до приема сервером"""
+        self.latency.record(latency)
+        self.latency_total.record(latency)
+        histogram = self.pc_latency.get(pc_key)
+        if histogram is None:
+            histogram = self.pc_latency[pc_key] = LatencyHistogram()
+        histogram.record(latency)
+    
+    def ingest_snapshot(self, data, pc_key=None, arrival=None):
+        """Разбор снимка ПК и раздача его показаний узлам датчиков за один проход"""
+        snapshot = decode_snapshot(data) if data else None
+        if snapshot is None:
+            self.snapshot_rejected += 1
+            return
+        self.snapshot_writes += 1
+        timestamp, node_ids, values = snapshot
+        if arrival is None:
+            arrival = time.time()
+        # Все показания снимка сняты одновременно - одна задержка на ПК
+        if pc_key is not None:
+            self.record_latency(pc_key, arrival - timestamp)
+        for node_id, value in zip(node_ids, values):
+            info = self.node_info.get(node_id)
+            # Снимок может обновлять только датчики своего ПК
+            if info is None or (pc_key is not None and (info['building'], info['room'], info['pc']) != pc_key):
+                self.snapshot_unknown_sensors += 1
+            elif math.isfinite(value):
+                self.ingest.put(node_id, value, timestamp, arrival, apply=True)
+    
+    def ingest_records(self, records):
+        """Прием показаний, полученных в обход OPC UA: [(node_id, timestamp, value)]"""
+        arrival = time.time()
+        for node_id, timestamp, value in records:
+            if node_id not in self.nodes:
+                self.udp_unknown_sensors += 1
+            elif not valid_reading(timestamp, value, arrival):
+                self.udp_invalid_values += 1
+            else:
+                info = self.node_info[node_id]
+                self.record_latency((info['building'], info['room'], info['pc']), arrival - timestamp)
+                self.ingest.put(node_id, value, timestamp, arrival, apply=True)
+    
+    async def _address_space_consumer(self, batch):
+        """Запись в адресное пространство значений, пришедших не через OPC UA"""
+        server_timestamp = datetime.now(timezone.utc)
+        for node_id, (value, source_ts, arrival, apply) in batch.items():
+            if not apply:
+                continue
+            # Ошибка одной записи не должна останавливать остальные показания пакета
+            try:
+                await self.server.write_attribute_value(self.nodes[node_id].nodeid, ua.DataValue(
+                    ua.Variant(value, ua.VariantType.Double),
+                    SourceTimestamp=datetime.fromtimestamp(source_ts, timezone.utc),
+                    ServerTimestamp=server_timestamp
+                ))
+            except Exception as e:
+                self.address_space_errors += 1
+                if self.address_space_errors == 1:
+                    print(f"ERROR: Ошибка записи узла {node_id}: {e}")
+    
+    def _liveness_consumer(self, batch):
+        """Учет записей датчиков в мониторе активности"""
+        for node_id, (value, source_ts, arrival, apply) in batch.items():
+            info = self.node_info[node_id]
+            self.liveness.touch(node_id, (info['building'], info['room'], info['pc']))
+    
+    def _change_consumer(self, batch):
+        """Накопление изменившихся значений для монитора"""
+        for node_id, (value, source_ts, arrival, apply) in batch.items():
+            self.changed_values[node_id] = value
+    
+    def _snapshot_consumer(self, batch):
+        """Учет записей в снимке парка (сборка ответа - после всего пакета)"""
+        for node_id, (value, source_ts, arrival, apply) in batch.items():
+            self.snapshot.update(node_id, value, source_ts, arrival)
+    
+    async def start_http(self):
+        """Запуск HTTP API снимка парка"""
+        self.http_server = await asyncio.start_server(self._handle_http, self.http_host, self.http_port)
+        print(f"SUCCESS: HTTP снимок парка: http://{self.http_host}:{self.http_port}/api/snapshot")
+    
+    async def _handle_http(self, reader, writer):
+        """Обработка HTTP соединения. Ответ - заранее собранные байты снимка или 304 по ETag"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=30)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                request = lines[0].split()
+                if len(request) != 3:
+                    writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+                    break
+                method, target, version = request
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                self.http_requests += 1
+                
+                # Соединение держим открытым только для HTTP/1.1 без Connection: close
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                snapshot = self.snapshot
+                if method not in ('GET', 'HEAD'):
+                    writer.write(b"HTTP/1.1 405 Method Not Allowed\r\nAllow: GET, HEAD\r\n"
+                                 b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+                    keep_alive = False
+                elif target.partition('?')[0] != '/api/snapshot':
+                    writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                elif snapshot.etag in headers.get('if-none-match', ''):
+                    self.http_not_modified += 1
+                    writer.write(f"HTTP/1.1 304 Not Modified\r\nETag: {snapshot.etag}\r\n\r\n".encode('ascii'))
+                else:
+                    writer.write(snapshot.response_head)
+                    if method == 'GET':
+                        writer.write(snapshot.body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def ingest_loop(self):
+        """Пакетная передача принятых записей потребителям"""
+        while self.is_started:
+            try:
+                await asyncio.sleep(self.ingest.batch_window)
+                
+                while self.ingest.pending:
+                    await self.ingest.dispatch(self.ingest.take_batch())
+                    # Отдаем управление циклу событий между пакетами
+                    await asyncio.sleep(0)
+                self.snapshot.rebuild()
+                
+                for metric, value in self.metrics().items():
+                    await self.server.write_attribute_value(
+                        self.metric_nodes[metric].nodeid,
+                        ua.DataValue(ua.Variant(value, ua.VariantType.UInt64))
+                    )
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"ERROR: Ошибка обработки очереди записей: {e}")
+                await asyncio.sleep(1)
+    
+    def metrics(self):
+        """Метрики приема данных"""
+        metrics = self.ingest.metrics()
+        metrics['udp_datagrams'] = self.udp_protocol.datagrams if self.udp_protocol else 0
+        metrics['udp_rejected'] = self.udp_protocol.rejected if self.udp_protocol else 0
+        metrics['udp_unknown_sensors'] = self.udp_unknown_sensors
+        metrics['udp_invalid_values'] = self.udp_invalid_values
+        metrics['address_space_errors'] = self.address_space_errors
+        metrics['opcua_invalid_values'] = self.opcua_invalid_values
+        metrics['snapshot_writes'] = self.snapshot_writes
+        metrics['snapshot_rejected'] = self.snapshot_rejected
+        metrics['snapshot_unknown_sensors'] = self.snapshot_unknown_sensors
+        metrics['http_requests'] = self.http_requests
+        metrics['http_not_modified'] = self.http_not_modified
+        return metrics
+    
+    async def _publish_interval(self):
+        """Публикация текущего целевого интервала опроса"""
+        self.liveness.set_interval(self.rate.interval)
+        await self.server.write_attribute_value(
+            self.target_interval_node.nodeid,
+            ua.DataValue(ua.Variant(float(self.rate.interval), ua.VariantType.Double))
+        )
+    
+    async def rate_control_loop(self, period=5.0):
+        """Увеличение интервала опроса клиентов при перегрузке сервера"""
+        loop = asyncio.get_running_loop()
+        while self.is_started:
+            try:
+                started = loop.time()
+                await asyncio.sleep(period)
+                # Задержка пробуждения показывает загрузку цикла событий
+                loop_lag = loop.time() - started - period
+                
+                if self.rate.update(self.ingest.reset_peak_depth(), loop_lag):
+                    await self._publish_interval()
+                    print(f"RATE: Целевой интервал опроса: {self.rate.interval:.0f} с "
+                          f"(задержка цикла {loop_lag * 1000:.0f} мс)")
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"ERROR: Ошибка управления интервалом опроса: {e}")
+                await asyncio.sleep(1)
+    
+    async def _publish_pc_latency(self, pc_key, summary):
+        """Запись задержки ПК в его узлы (узлы создаются при первом замере)"""
+        nodes = self.pc_latency_nodes.get(pc_key)
+        if nodes is None:
+            building, room, pc = pc_key
+            pc_root = await self.latency_root.add_object(self.namespace_idx, f"B{building}_R{room}_P{pc}")
+            nodes = self.pc_latency_nodes[pc_key] = {}
+            for name, variant_type in (
+                ("Count", ua.VariantType.UInt64),
+                ("P50Ms", ua.VariantType.Double),
+                ("P95Ms", ua.VariantType.Double),
+                ("MaxMs", ua.VariantType.Double),
+            ):
+                nodes[name] = await pc_root.add_variable(self.namespace_idx, name, ua.Variant(0, variant_type))
+        for name, value in (
+            ("Count", ua.Variant(summary['count'], ua.VariantType.UInt64)),
+            ("P50Ms", ua.Variant(summary['p50'] * 1000, ua.VariantType.Double)),
+            ("P95Ms", ua.Variant(summary['p95'] * 1000, ua.VariantType.Double)),
+            ("MaxMs", ua.Variant(summary['max'] * 1000, ua.VariantType.Double)),
+        ):
+            await self.server.write_attribute_value(nodes[name].nodeid, ua.DataValue(value))
+    
+    async def latency_loop(self, period=60.0):
+        """Публикация задержек доставки за окно и вывод самых медленных ПК"""
+        while self.is_started:
+            try:
+                await asyncio.sleep(period)
+                
+                summary = self.latency.summary()
+                for name, value in (
+                    ("Count", ua.Variant(summary['count'], ua.VariantType.UInt64)),
+                    ("MeanMs", ua.Variant(summary['mean'] * 1000, ua.VariantType.Double)),
+                    ("P50Ms", ua.Variant(summary['p50'] * 1000, ua.VariantType.Double)),
+                    ("P95Ms", ua.Variant(summary['p95'] * 1000, ua.VariantType.Double)),
+                    ("P99Ms", ua.Variant(summary['p99'] * 1000, ua.VariantType.Double)),
+                    ("MaxMs", ua.Variant(summary['max'] * 1000, ua.VariantType.Double)),
+                    ("ClockSkewed", ua.Variant(self.latency_total.negative, ua.VariantType.UInt64)),
+                    ("Buckets", ua.Variant(list(self.latency_total.counts), ua.VariantType.UInt64)),
+                ):
+                    await self.server.write_attribute_value(self.latency_nodes[name].nodeid, ua.DataValue(value))
+                
+                # ПК без замеров в этом окне публикуются с нулевым числом замеров
+                pc_summaries = {pc_key: histogram.summary() for pc_key, histogram in self.pc_latency.items()}
+                for pc_key in self.pc_latency_nodes:
+                    pc_summaries.setdefault(pc_key, LatencyHistogram().summary())
+                for pc_key, pc_summary in pc_summaries.items():
+                    await self._publish_pc_latency(pc_key, pc_summary)
+                
+                if summary['count']:
+                    print(f"LATENCY: {summary['count']} показаний за {period:.0f} с, мс: "
+                          f"p50 {summary['p50'] * 1000:.0f}, p95 {summary['p95'] * 1000:.0f}, "
+                          f"p99 {summary['p99'] * 1000:.0f}, max {summary['max'] * 1000:.0f}")
+                    slowest = sorted(self.pc_latency.items(), key=lambda item: item[1].quantile(0.95), reverse=True)[:3]
+                    for (building, room, pc), histogram in slowest:
+                        print(f"   B{building}_R{room}_P{pc}: p95 {histogram.quantile(0.95) * 1000:.0f} мс, "
+                              f"max {histogram.max * 1000:.0f} мс")
+                
+                self.latency.reset()
+                self.pc_latency = {}
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"ERROR: Ошибка публикации задержек: {e}")
+                await asyncio.sleep(1)
+    
+    async def liveness_loop(self):
+        """Периодическая пометка устаревших датчиков и отключившихся ПК"""
+        while self.is_started:
+            try:
+                transitions, pcs_changed = self.liveness.tick()
+                
+                for node_id, state in transitions:
+                    node = self.nodes[node_id]
+                    # Меняем качество. Uncertain сохраняет последнее значение, а при Bad
+                    # asyncua заменяет Value на Null - читатели получают None. Последнее
+                    # показание остается в снимке парка (HTTP API)
+                    last = self.server.read_attribute_value(node.nodeid)
+                    await self.server.write_attribute_value(node.nodeid, ua.DataValue(
+                        last.Value,
+                        ua.StatusCode(SENSOR_STATUS_CODES[state]),
+                        SourceTimestamp=last.SourceTimestamp,
+                        ServerTimestamp=datetime.now(timezone.utc)
+                    ))
+                    if state == SENSOR_BAD:
+                        print(f"STALE: {self.node_info[node_id]['display_name']}: нет данных")
+                    self.snapshot.mark(node_id)
+                
+                if pcs_changed:
+                    self.snapshot.sync_offline()
+                    await self.offline_pcs_node.write_value(
+                        ua.Variant(len(self.liveness.offline_pcs), ua.VariantType.UInt32)
+                    )
+                    print(f"STATUS: ПК без связи: {len(self.liveness.offline_pcs)}")
+                self.snapshot.rebuild()
+                
+                await asyncio.sleep(self.liveness.wheel.tick)
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"ERROR: Ошибка контроля активности: {e}")
+                await asyncio.sleep(1)
+    
+    def monitor_iteration(self, last_values):
+        """Один проход мониторинга: вывод значений, изменившихся с прошлой проверки"""
+        changed_values = []
+        
+        # Проверяем только узлы, записанные с прошлой проверки
+        updates, self.changed_values = self.changed_values, {}
+        for node_id, value in updates.items():
+            try:
+                # Проверяем изменения (показываем только изменившиеся значения)
+                if node_id not in last_values or abs(last_values[node_id] - value) > 0.1:
+                    if value > 0:  # Показываем только ненулевые значения
+                        info = self.node_info[node_id]
+                        changed_values.append((node_id, value, info))
+                last_values[node_id] = value
+                        
+            except Exception:
+                pass  # Игнорируем ошибки отдельных значений
+        
+        # Выводим изменения
+        if changed_values:
+            timestamp = datetime.now().strftime("%H:%M:%S")
+            print(f"\nUPDATE: [{timestamp}] Обновления температуры:")
+            for node_id, value, info in changed_values:
+                print(f"   TEMP: {info['display_name']}: {value:.1f}°C")
+                if info['hardware_name'] != 'Unknown':
+                    print(f"      ({info['hardware_name']} - {info['sensor_name']})")
+        return changed_values
+    
     async def monitor_changes(self):
         """Мониторинг изменений значений"""
         print("\nMONITOR: Начинаем мониторинг изменений температуры...")
@@ -241,34 +1249,7 @@ class TemperatureOPCUAServer:
         
         while self.is_started:
             try:
-                current_values = {}
-                changed_values = []
-                
-                # Проверяем все созданные узлы
-                for node_id, node in self.nodes.items():
-                    try:
-                        value = await node.read_value()
-                        current_values[node_id] = value
-                        
-                        # Проверяем изменения (показываем только изменившиеся значения)
-                        if node_id not in last_values or abs(last_values[node_id] - value) > 0.1:
-                            if value > 0:  # Показываем только ненулевые значения
-                                info = self.node_info[node_id]
-                                changed_values.append((node_id, value, info))
-                                
-                    except Exception:
-                        pass  # Игнорируем ошибки чтения отдельных узлов
-                
-                # Выводим изменения
-                if changed_values:
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    print(f"\nUPDATE: [{timestamp}] Обновления температуры:")
-                    for node_id, value, info in changed_values:
-                        print(f"   TEMP: {info['display_name']}: {value:.1f}°C")
-                        if info['hardware_name'] != 'Unknown':
-                            print(f"      ({info['hardware_name']} - {info['sensor_name']})")
-                
-                last_values = current_values
+                self.monitor_iteration(last_values)
                 await asyncio.sleep(3)  # Проверяем каждые 3 секунды
                 
             except asyncio.CancelledError:
@@ -288,13 +1269,13 @@ class TemperatureOPCUAServer:
             computers = {}
             active_computers = 0
             for node_id, info in self.node_info.items():
-                # Проверяем, был ли узел активен (значение > 0)
+                # Проверяем, был ли узел активен (значение > 0; у устаревших датчиков - None)
                 try:
                     value = asyncio.run_coroutine_threadsafe(
                         self.nodes[node_id].read_value(), 
                         asyncio.get_event_loop()
                     ).result(timeout=0.1)
-                    if value > 0:
+                    if value is not None and value > 0:
                         comp_key = f"B{info['building']}_R{info['room']}_P{info['pc']}"
                         if comp_key not in computers:
                             computers[comp_key] = []
@@ -310,11 +1291,18 @@ class TemperatureOPCUAServer:
                 print(f"     - {comp}: {len(active_sensors)} активных датчиков ({', '.join(hw_types)})")
 
 async def main():
+    parser = argparse.ArgumentParser(description="OPC UA сервер мониторинга температуры")
+    parser.add_argument('--udp-port', type=int, default=None,
+                        help="порт приема показаний по UDP (по умолчанию выключен)")
+    parser.add_argument('--http-port', type=int, default=None,
+                        help="порт HTTP API снимка парка для панелей (по умолчанию выключен)")
+    args = parser.parse_args()
+    
     # Настройка логирования
     logging.basicConfig(level=logging.WARNING)
     
     # Создание и запуск сервера
-    server = TemperatureOPCUAServer()
+    server = TemperatureOPCUAServer(udp_port=args.udp_port, http_port=args.http_port)
     
     try:
         print("Инициализация универсального OPC UA сервера...")
@@ -327,6 +1315,10 @@ async def main():
         
         # Создаем задачи для мониторинга и статуса
         monitor_task = asyncio.create_task(server.monitor_changes())
+        liveness_task = asyncio.create_task(server.liveness_loop())
+        ingest_task = asyncio.create_task(server.ingest_loop())
+        rate_task = asyncio.create_task(server.rate_control_loop())
+        latency_task = asyncio.create_task(server.latency_loop())
         
         # Периодический вывод статуса
         # async def status_reporter():
@@ -337,7 +1329,7 @@ async def main():
         # status_task = asyncio.create_task(status_reporter())
         
         # Ждем завершения
-        await asyncio.gather(monitor_task)
+        await asyncio.gather(monitor_task, liveness_task, ingest_task, rate_task, latency_task)
          
     except KeyboardInterrupt:
         print("\n\nПолучен сигнал остановки...")
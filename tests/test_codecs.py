@@ -0,0 +1,76 @@
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from client import SensorBatch, TemperatureOPCUAClient
+from server import MAX_CLOCK_AHEAD, decode_datagram, decode_snapshot, valid_reading
+
+
+def make_client():
+    config = {
+        "opcua_server": {"url": "opc.tcp://localhost:4840/freeopcua/server/",
+                         "namespace": "http://university.temperature.monitoring"},
+        "location": {"building_number": 1, "room_number": 101, "pc_number": 3}
+    }
+    return TemperatureOPCUAClient(config=config, verbose=False)
+
+
+def make_batch(values, timestamp):
+    batch = SensorBatch()
+    for index, value in enumerate(values):
+        batch.add_sensor(None, 'CPU', 'Intel Core', index, f'Core #{index}')
+        batch.values[index] = value
+        batch.selected[index] = 1
+    batch.timestamp = timestamp
+    return batch
+
+
+def test_datagram_round_trip():
+    client = make_client()
+    now = time.time()
+    batch = make_batch([41.5, 42.0, 55.25], now)
+    batch.selected[1] = 0
+
+    records = []
+    for datagram in client.encode_datagrams(batch):
+        records.extend(decode_datagram(bytes(datagram)))
+
+    node_ids = client.prepare_batch(batch)
+    assert records == [(node_ids[0], now, 41.5), (node_ids[2], now, 55.25)]
+
+
+def test_datagram_rejects_malformed():
+    client = make_client()
+    datagram = bytes(next(client.encode_datagrams(make_batch([40.0], time.time()))))
+    assert decode_datagram(datagram[:-1]) is None
+    assert decode_datagram(b'XX' + datagram[2:]) is None
+
+
+def test_snapshot_round_trip():
+    client = make_client()
+    now = time.time()
+    batch = make_batch([41.5, 42.0, 55.25], now)
+    batch.selected[1] = 0
+
+    timestamp, node_ids, values = decode_snapshot(client.encode_snapshot(batch))
+    assert timestamp == now
+    assert list(node_ids) == client.prepare_batch(batch)
+    assert values[0] == 41.5 and math.isnan(values[1]) and values[2] == 55.25
+
+
+def test_snapshot_rejects_bad_timestamp():
+    client = make_client()
+    for timestamp in (math.nan, math.inf, 1e20, -1.0, time.time() + 2 * MAX_CLOCK_AHEAD):
+        assert decode_snapshot(client.encode_snapshot(make_batch([40.0], timestamp))) is None
+
+
+def test_valid_reading():
+    now = time.time()
+    assert valid_reading(now, 40.0, now)
+    assert not valid_reading(1e20, 40.0, now)
+    assert not valid_reading(math.nan, 40.0, now)
+    assert not valid_reading(0.0, 40.0, now)
+    assert not valid_reading(now, math.inf, now)
@@ -0,0 +1,21 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from server import IngestQueue
+
+
+def test_newer_opcua_write_is_not_applied_again():
+    queue = IngestQueue()
+    queue.put(1, 50.0, 1000.0, 1000.0, apply=True)
+    queue.put(1, 51.0, None, 1000.5)
+    assert queue.pending[1] == (51.0, None, 1000.5, False)
+    assert queue.coalesced == 1
+
+
+def test_newer_udp_reading_is_applied():
+    queue = IngestQueue()
+    queue.put(1, 50.0, None, 1000.0)
+    queue.put(1, 51.0, 1000.5, 1000.5, apply=True)
+    assert queue.pending[1] == (51.0, 1000.5, 1000.5, True)
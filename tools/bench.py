@@ -0,0 +1,388 @@
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import platform
+import statistics
+import tracemalloc
+from array import array
+from datetime import datetime
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import client
+from client import TemperatureOPCUAClient, AdaptiveSampler, SensorBatch, fetch_stats, DISCOVERY_CYCLES
+from server import TemperatureOPCUAServer
+
+NAMESPACE = "http://university.temperature.monitoring"
+SERVER_URL = "opc.tcp://127.0.0.1:4860/freeopcua/server/"
+
+HARDWARE_TYPE_IDS = {name: number for number, name in client.HARDWARE_TYPES.items()}
+
+
+class FakeSensor:
+    """Датчик с интерфейсом OpenHardwareMonitor.ISensor"""
+    def __init__(self, hardware, index, name, value, sensor_type='Temperature'):
+        self.Hardware = hardware
+        self.Index = index
+        self.Name = name
+        self.Value = value
+        self.SensorType = sensor_type
+
+
+class FakeHardware:
+    """Оборудование с интерфейсом OpenHardwareMonitor.IHardware"""
+    def __init__(self, hardware_type, name):
+        self.HardwareType = HARDWARE_TYPE_IDS[hardware_type]
+        self.Name = name
+        self.Sensors = []
+        self.SubHardware = []
+
+    def Update(self):
+        pass
+
+
+class FakeComputer:
+    """Набор оборудования с n_sensors датчиками температуры (и датчиками других типов)"""
+    def __init__(self, n_sensors):
+        cpu = FakeHardware('CPU', 'Fake CPU')
+        board = FakeHardware('Mainboard', 'Fake Board')
+        superio = FakeHardware('SuperIO', 'Fake SuperIO')
+        board.SubHardware.append(superio)
+        for i in range(n_sensors):
+            owner = cpu if i % 2 == 0 else superio
+            owner.Sensors.append(FakeSensor(owner, i, f"Sensor #{i}", 40.0 + i % 20))
+            # Датчики не температуры тоже перебираются в fetch_stats
+            owner.Sensors.append(FakeSensor(owner, i, f"Load #{i}", 10.0, 'Load'))
+        self.Hardware = [cpu, board]
+
+
+def fake_sensor_data(n_sensors):
+    return SensorBatch.from_records([{
+        'hardware_type': 'CPU',
+        'hardware_name': 'Fake CPU',
+        'sensor_index': i,
+        'sensor_name': f"Sensor #{i}",
+        'temperature': 40.0 + i % 20
+    } for i in range(n_sensors)])
+
+
+def measure(func, number, repeat=5):
+    """Время одной операции (с) в каждом из repeat замеров по number вызовов"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+    return samples
+
+
+async def measure_async(func, number, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            await func()
+        samples.append((time.perf_counter() - started) / number)
+    return samples
+
+
+def summarize(samples):
+    return {
+        'median_s': statistics.median(samples),
+        'min_s': min(samples),
+        'max_s': max(samples),
+        'repeat': len(samples)
+    }
+
+
+def bench_node_ids(results):
+    opcua_client = TemperatureOPCUAClient(config={
+        "opcua_server": {"url": SERVER_URL, "namespace": NAMESPACE},
+        "location": {"building_number": 1, "room_number": 101, "pc_number": 1}
+    }, verbose=False)
+    server = TemperatureOPCUAServer(SERVER_URL)
+    results['client.generate_node_id'] = summarize(
+        measure(lambda: opcua_client.generate_node_id(1, 101, 1, 'CPU', 3), 20000))
+    results['server.generate_node_id'] = summarize(
+        measure(lambda: server.generate_node_id(1, 101, 1, 'CPU', 3), 20000))
+
+
+def bench_fetch_stats(results, sizes):
+    for n_sensors in sizes:
+        computer = FakeComputer(n_sensors)
+        batch = SensorBatch()
+
+        def run():
+            # Вывод fetch_stats входит в замер, но не попадает в консоль
+            with redirect_stdout(io.StringIO()):
+                fetch_stats(computer, batch)
+
+        results[f'client.fetch_stats[{n_sensors}]'] = summarize(measure(run, max(10, 2000 // n_sensors)))
+
+
+def bench_monitor_iteration(results, sizes):
+    server = TemperatureOPCUAServer(SERVER_URL)
+    for n_nodes in sizes:
+        server.node_info = {node_id: {
+            'display_name': f"B1_R1_P{node_id}_CPU_0",
+            'hardware_name': 'Fake CPU',
+            'sensor_name': 'Sensor'
+        } for node_id in range(n_nodes)}
+        last_values = {}
+        step = [0]
+
+        def run():
+            # Каждый проход все узлы записаны и изменились
+            step[0] += 1
+            server.changed_values = {node_id: 40.0 + step[0] % 2 for node_id in range(n_nodes)}
+            with redirect_stdout(io.StringIO()):
+                server.monitor_iteration(last_values)
+
+        run()
+        results[f'server.monitor_iteration[{n_nodes}]'] = summarize(measure(run, 1, repeat=5))
+
+
+async def bench_server_paths(results, send_sizes, create_count):
+    server = TemperatureOPCUAServer(SERVER_URL)
+    with redirect_stdout(io.StringIO()):
+        await server.initialize()
+        await server.start()
+    try:
+        # Создание узлов: каждый замер создает create_count новых узлов
+        counter = [0]
+
+        async def create():
+            counter[0] += 1
+            await server.create_sensor_node(2, 200, counter[0], 'CPU', 'Fake CPU', 0, 'Sensor')
+
+        with redirect_stdout(io.StringIO()):
+            samples = await measure_async(create, create_count)
+        results['server.create_sensor_node'] = summarize(samples)
+
+        with redirect_stdout(io.StringIO()):
+            for i in range(max(send_sizes)):
+                await server.create_sensor_node(1, 101, 1, 'CPU', 'Fake CPU', i, f"Sensor #{i}")
+
+        opcua_client = TemperatureOPCUAClient(config={
+            "opcua_server": {"url": SERVER_URL, "namespace": NAMESPACE},
+            "location": {"building_number": 1, "room_number": 101, "pc_number": 1}
+        }, verbose=False)
+        with redirect_stdout(io.StringIO()):
+            await opcua_client.connect()
+        try:
+            for transport in ('opcua', 'snapshot'):
+                opcua_client.transport = transport
+                suffix = '' if transport == 'opcua' else ':snapshot'
+                for n_sensors in send_sizes:
+                    sensor_data = fake_sensor_data(n_sensors)
+                    samples = await measure_async(
+                        lambda: opcua_client.send_temperature_data(sensor_data),
+                        max(1, 100 // n_sensors), repeat=3)
+                    results[f'client.send_temperature_data{suffix}[{n_sensors}]'] = summarize(samples)
+        finally:
+            with redirect_stdout(io.StringIO()):
+                await opcua_client.disconnect()
+    finally:
+        with redirect_stdout(io.StringIO()):
+            await server.stop()
+
+
+async def bench_http_snapshot(results, pc_counts, number):
+    """Отдача снимка парка по HTTP: полный ответ и 304 по ETag через одно keep-alive соединение"""
+    port = 4861
+    for n_pcs in pc_counts:
+        server = TemperatureOPCUAServer(SERVER_URL, http_host='127.0.0.1', http_port=port)
+        now = time.time()
+        for pc in range(n_pcs):
+            for index in range(10):
+                node_id = pc * 100 + index
+                server.node_info[node_id] = {
+                    'building': 1, 'room': 100 + pc // 30, 'pc': pc % 30 + 1,
+                    'hardware_type': 'CPU', 'hardware_name': 'Fake CPU', 'sensor_index': index,
+                    'sensor_name': f"Sensor #{index}", 'display_name': f"B1_R{100 + pc // 30}_P{pc % 30 + 1}_CPU_{index}"
+                }
+                server.snapshot.update(node_id, 40.0 + index, now, now)
+        server.snapshot.rebuild()
+        with redirect_stdout(io.StringIO()):
+            await server.start_http()
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            async def request(etag=None):
+                head = f"GET /api/snapshot HTTP/1.1\r\nHost: bench\r\n"
+                if etag:
+                    head += f"If-None-Match: {etag}\r\n"
+                writer.write((head + "\r\n").encode('ascii'))
+                response = await reader.readuntil(b'\r\n\r\n')
+                for line in response.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        await reader.readexactly(int(line.split(b':')[1]))
+
+            results[f'server.http_snapshot[{n_pcs} ПК]'] = summarize(await measure_async(request, number))
+            etag = server.snapshot.etag
+            results[f'server.http_snapshot_304[{n_pcs} ПК]'] = summarize(
+                await measure_async(lambda: request(etag), number))
+        finally:
+            writer.close()
+            await writer.wait_closed()
+            # Даем обработчику соединения на сервере увидеть закрытие
+            await asyncio.sleep(0.01)
+            await server.stop()
+        results[f'server.snapshot_rebuild_1pc[{n_pcs} ПК]'] = summarize(measure(
+            lambda: (server.snapshot.update(0, 41.0, now, now), server.snapshot.rebuild()), 50))
+
+
+def measure_allocations(func, cycles):
+    """Память на цикл по tracemalloc: пик временных выделений и остаток после цикла (байт)"""
+    func()
+    # Массив выделен заранее, чтобы сам замер не давал остатка
+    peaks = array('d', bytes(8 * cycles))
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        for i in range(cycles):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            peaks[i] = tracemalloc.get_traced_memory()[1] - current
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'peak_bytes': statistics.median(peaks),
+        'net_bytes_per_cycle': (after - before) / cycles,
+        'cycles': cycles
+    }
+
+
+def bench_allocations(results, sizes, cycles):
+    """Выделения памяти в цикле клиента: чтение датчиков, выбор к отправке и упаковка UDP"""
+    opcua_client = TemperatureOPCUAClient(config={
+        "opcua_server": {"url": SERVER_URL, "namespace": NAMESPACE},
+        "location": {"building_number": 1, "room_number": 101, "pc_number": 1}
+    }, verbose=False)
+    for n_sensors in sizes:
+        computer = FakeComputer(n_sensors)
+        batch = SensorBatch()
+        sampler = AdaptiveSampler(min_interval=1, max_interval=10)
+        clock = [0.0]
+
+        def cycle():
+            clock[0] += 1
+            fetch_stats(computer, batch, verbose=False)
+            sampler.select_due(batch, clock[0])
+            for _ in opcua_client.encode_datagrams(batch):
+                pass
+
+        # Вывод RATE при первых изменениях интервала и первый повторный поиск датчиков
+        # не входят в замер
+        with redirect_stdout(io.StringIO()):
+            for _ in range(DISCOVERY_CYCLES + 1):
+                cycle()
+            results[f'alloc.client_cycle[{n_sensors}]'] = measure_allocations(cycle, cycles)
+
+
+def run_benchmarks(quick=False, only=None):
+    results = {}
+    groups = {
+        'node_id': lambda: bench_node_ids(results),
+        'fetch_stats': lambda: bench_fetch_stats(results, (10, 100) if quick else (10, 100, 1000)),
+        'monitor': lambda: bench_monitor_iteration(results, (1000, 10000) if quick else (1000, 10000, 100000)),
+        'server': lambda: asyncio.run(bench_server_paths(
+            results, (10, 100) if quick else (10, 100, 1000), 100 if quick else 500)),
+        'http': lambda: asyncio.run(bench_http_snapshot(results, (100, 1000) if quick else (100, 1000, 5000), 200)),
+        'alloc': lambda: bench_allocations(results, (20, 100) if quick else (20, 100, 1000), 200),
+    }
+    for name, run in groups.items():
+        if only and name not in only:
+            continue
+        print(f"BENCH: {name}...")
+        run()
+    return results
+
+
+def print_results(results):
+    for name, stats in results.items():
+        if 'peak_bytes' in stats:
+            print(f"   {name:45s} {stats['peak_bytes']:12.0f} байт пик, "
+                  f"{stats['net_bytes_per_cycle']:.1f} байт/цикл остаток")
+            continue
+        print(f"   {name:45s} {stats['median_s'] * 1e6:12.2f} мкс (min {stats['min_s'] * 1e6:.2f})")
+
+
+def compare(baseline_path, current_path, threshold):
+    """Сравнение с базовыми результатами. Возвращает число регрессий"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    with open(current_path, 'r', encoding='utf-8') as f:
+        current = json.load(f)['results']
+
+    regressions = 0
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            print(f"   {name:45s} {'только в ' + ('текущих' if name in current else 'базовых'):>20s}")
+            continue
+        if 'peak_bytes' in current[name]:
+            # Память сравнивается по пику на цикл
+            old = baseline[name]['peak_bytes']
+            new = current[name]['peak_bytes']
+            mark = "REGRESSION" if new > old * (1 + threshold) + 64 else ""
+            regressions += bool(mark)
+            print(f"   {name:45s} {old:12.0f} -> {new:12.0f} байт {mark}")
+            continue
+        ratio = current[name]['median_s'] / baseline[name]['median_s']
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "REGRESSION"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            mark = "faster"
+        print(f"   {name:45s} {baseline[name]['median_s'] * 1e6:12.2f} -> "
+              f"{current[name]['median_s'] * 1e6:12.2f} мкс  x{ratio:.2f} {mark}")
+    print(f"RESULT: регрессий больше {threshold * 100:.0f}%: {regressions}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарки горячих путей клиента и сервера")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="выполнить замеры и сохранить JSON")
+    run_parser.add_argument('--output', default='bench_results.json')
+    run_parser.add_argument('--quick', action='store_true', help="меньшие размеры для быстрой проверки")
+    run_parser.add_argument('--only', nargs='*', choices=('node_id', 'fetch_stats', 'monitor', 'server', 'http', 'alloc'))
+
+    compare_parser = commands.add_parser('compare', help="сравнить результаты с базовыми")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help="допустимое замедление (доля)")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.command == 'run':
+        results = run_benchmarks(args.quick, args.only)
+        print_results(results)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'quick': args.quick
+                },
+                'results': results
+            }, f, indent=2, ensure_ascii=False)
+        print(f"SUCCESS: результаты сохранены в {args.output}")
+    else:
+        sys.exit(1 if compare(args.baseline, args.current, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+import os
+import re
+import io
+import sys
+import math
+import time
+import random
+import asyncio
+import argparse
+import logging
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client import TemperatureOPCUAClient, SensorBatch
+from server import TemperatureOPCUAServer
+from tempdata import RecordingReader
+
+NAMESPACE = "http://university.temperature.monitoring"
+
+# Типичный набор датчиков синтетического ПК
+SYNTHETIC_SENSORS = [
+    ("CPU", 0, "CPU Core #1"),
+    ("CPU", 1, "CPU Core #2"),
+    ("CPU", 2, "CPU Core #3"),
+    ("CPU", 3, "CPU Core #4"),
+    ("CPU", 4, "CPU Package"),
+    ("SuperIO", 0, "CPU Core"),
+    ("SuperIO", 1, "Temperature #1"),
+    ("SuperIO", 2, "Temperature #2"),
+    ("GpuNvidia", 0, "GPU Core"),
+    ("HDD", 0, "Temperature"),
+    ("SSD", 0, "Temperature"),
+]
+
+# Имя датчика в записи tempdata: "<тип> <оборудование> #<индекс> <датчик>"
+RECORDED_NAME = re.compile(r'^(\S+) (.*) #(\d+) (.*)$')
+
+
+def synthetic_trace(seed, duration, interval, sensors=SYNTHETIC_SENSORS):
+    """Детерминированная синтетическая трасса одного ПК: [(время, sensor_data)]"""
+    rng = random.Random(seed)
+    phases = [rng.uniform(0, 2 * math.pi) for _ in sensors]
+    bases = [rng.uniform(35, 55) for _ in sensors]
+    trace = []
+    steps = int(duration / interval)
+    for step in range(steps):
+        t = step * interval
+        sensor_data = []
+        for (hw_type, index, name), phase, base in zip(sensors, phases, bases):
+            sensor_data.append({
+                'hardware_type': hw_type,
+                'hardware_name': f"Synthetic {hw_type}",
+                'sensor_index': index,
+                'sensor_name': name,
+                'temperature': round(base + 10 * math.sin(t / 300 + phase) + rng.uniform(-0.5, 0.5), 1)
+            })
+        trace.append((t, sensor_data))
+    return trace
+
+
+def recorded_trace(path):
+    """Трасса из файла записи tempdata: [(время от начала, sensor_data)]"""
+    reader = RecordingReader(path)
+    try:
+        parsed = {}
+        for name in reader.sensors:
+            match = RECORDED_NAME.match(name)
+            if match:
+                hw_type, hw_name, index, sensor_name = match.groups()
+                parsed[name] = (hw_type, hw_name, int(index), sensor_name)
+
+        trace = []
+        start = None
+        for t, readings in reader.replay():
+            if start is None:
+                start = t
+            sensor_data = [{
+                'hardware_type': parsed[name][0],
+                'hardware_name': parsed[name][1],
+                'sensor_index': parsed[name][2],
+                'sensor_name': parsed[name][3],
+                'temperature': value
+            } for name, value in readings.items() if name in parsed]
+            trace.append((t - start, sensor_data))
+        return trace
+    finally:
+        reader.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+class ReplayDriver:
+    """Воспроизведение трасс многих ПК через TemperatureOPCUAClient с ускорением"""
+    def __init__(self, url, traces, speed=1.0, transport='opcua', udp_port=4841, reconnect=None):
+        self.url = url
+        self.traces = traces  # [[(время, sensor_data)]] по одной трассе на ПК
+        self.speed = speed  # 0 - без пауз, с максимальной скоростью
+        self.transport = transport
+        self.udp_port = udp_port
+        self.reconnect = reconnect or {}  # Параметры переподключения клиентов (opcua_server)
+        self.clients = []
+
+        self.sent_readings = 0
+        self.sent_batches = 0
+        self.failed_batches = 0
+        self.buffered_batches = 0
+        # Время отправки последнего показания узла - для задержки, если клиент не передал SourceTimestamp
+        self.send_times = {}
+        self.lags = []
+        self.restarted_at = None
+        self.started_at = None  # Начало воспроизведения (UNIX) и последний прием сервером
+        self.last_arrival = None
+
+    def location(self, pc_index):
+        # ПК раскладываются по комнатам по 30 штук
+        return {
+            "building_number": 1,
+            "room_number": 100 + pc_index // 30,
+            "pc_number": pc_index % 30 + 1
+        }
+
+    def make_client(self, pc_index):
+        config = {
+            "opcua_server": {
+                "url": self.url,
+                "namespace": NAMESPACE,
+                "transport": self.transport,
+                "udp_port": self.udp_port,
+                **self.reconnect
+            },
+            "location": self.location(pc_index)
+        }
+        return TemperatureOPCUAClient(config=config, verbose=False)
+
+    async def prepare_server(self, server):
+        """Создание узлов всех ПК на локальном сервере и подключение замера задержки"""
+        with redirect_stdout(io.StringIO()):
+            for pc_index, trace in enumerate(self.traces):
+                location = self.location(pc_index)
+                sensors = {}
+                for _, sensor_data in trace:
+                    for sensor_info in sensor_data:
+                        sensors[(sensor_info['hardware_type'], sensor_info['sensor_index'])] = sensor_info
+                for sensor_info in sensors.values():
+                    await server.create_sensor_node(
+                        location['building_number'], location['room_number'], location['pc_number'],
+                        sensor_info['hardware_type'], sensor_info['hardware_name'],
+                        sensor_info['sensor_index'], sensor_info['sensor_name']
+                    )
+        server.ingest.add_consumer(self.measure_lag)
+
+    def measure_lag(self, batch):
+        """Потребитель очереди приема: задержка от снятия показания до приема сервером"""
+        for node_id, (value, source_ts, arrival, apply) in batch.items():
+            if self.last_arrival is None or arrival > self.last_arrival:
+                self.last_arrival = arrival
+            if source_ts is None:
+                source_ts = self.send_times.get(node_id)
+            if source_ts is not None:
+                self.lags.append(arrival - source_ts)
+
+    def make_batch(self, trace):
+        """Пакет клиента на объединение датчиков трассы и индексы датчиков для каждого шага"""
+        batch = SensorBatch()
+        positions = {}
+        steps = []
+        for t, sensor_data in trace:
+            step = []
+            for sensor_info in sensor_data:
+                key = (sensor_info['hardware_type'], sensor_info['sensor_index'])
+                if key not in positions:
+                    positions[key] = batch.add_sensor(
+                        None, sensor_info['hardware_type'], sensor_info['hardware_name'],
+                        sensor_info['sensor_index'], sensor_info['sensor_name']
+                    )
+                step.append((positions[key], sensor_info['temperature']))
+            steps.append((t, step))
+        return batch, steps
+
+    async def replay_pc(self, client, trace, wall_start):
+        # Пакет заполняется заново на каждом шаге, как в основном цикле клиента
+        batch, steps = self.make_batch(trace)
+        node_ids = client.prepare_batch(batch)
+        for t, step in steps:
+            if self.speed:
+                delay = wall_start + t / self.speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            batch.selected[:] = bytes(len(batch.selected))
+            batch.timestamp = now = time.time()
+            for k, value in step:
+                batch.values[k] = value
+                batch.selected[k] = 1
+                self.send_times[node_ids[k]] = now
+            if await client.submit(batch):
+                self.sent_batches += 1
+                self.sent_readings += len(step)
+            elif not client.connected:
+                self.buffered_batches += 1
+            else:
+                self.failed_batches += 1
+
+    async def run(self):
+        print(f"REPLAY: подключение {len(self.traces)} клиентов ({self.transport})...")
+        with redirect_stdout(io.StringIO()):
+            self.clients = [self.make_client(i) for i in range(len(self.traces))]
+            connected = await asyncio.gather(*(client.connect() for client in self.clients))
+        if not all(connected):
+            print(f"WARNING: подключено {sum(connected)} из {len(connected)} клиентов")
+        for client in self.clients:
+            client.start_supervisor()
+
+        speed = f"x{self.speed:g}" if self.speed else "максимальная"
+        print(f"REPLAY: воспроизведение, скорость {speed}...")
+        wall_start = time.monotonic()
+        self.started_at = time.time()
+        with redirect_stdout(io.StringIO()):
+            await asyncio.gather(*(self.replay_pc(client, trace, wall_start)
+                                   for client, trace in zip(self.clients, self.traces)))
+        elapsed = time.monotonic() - wall_start
+
+        with redirect_stdout(io.StringIO()):
+            await asyncio.gather(*(client.disconnect() for client in self.clients))
+        return elapsed
+
+    async def restart_server(self, server, ingest, at, downtime):
+        """Перезапуск локального сервера во время воспроизведения (проверка волны переподключений)"""
+        await asyncio.sleep(at)
+        print(f"REPLAY: остановка сервера на {downtime:g} с...")
+        ingest.cancel()
+        await server.server.stop()
+        server.is_started = False
+        await asyncio.sleep(downtime)
+        await server.server.start()
+        server.is_started = True
+        self.restarted_at = time.monotonic()
+        print("REPLAY: сервер снова запущен")
+        return asyncio.create_task(server.ingest_loop())
+
+    def report_reconnects(self):
+        """Распределение попыток переподключения во времени после перезапуска сервера"""
+        attempts = sorted(t - self.restarted_at for client in self.clients for t in client.reconnect_log)
+        if not attempts:
+            return
+        print(f"   • Попыток переподключения: {len(attempts)} у {len(self.clients)} клиентов")
+        per_second = {}
+        for t in attempts:
+            if t >= 0:
+                per_second[int(t)] = per_second.get(int(t), 0) + 1
+        if per_second:
+            peak_second = max(per_second, key=per_second.get)
+            print(f"   • После запуска сервера: пик {per_second[peak_second]} попыток/с "
+                  f"(секунда {peak_second}), последняя попытка через {attempts[-1]:.1f} с")
+            print("   • Попытки по секундам: " + " ".join(
+                f"{per_second.get(second, 0)}" for second in range(int(attempts[-1]) + 1)))
+        pending = sum(len(client.pending) for client in self.clients)
+        dropped = sum(client.pending_dropped for client in self.clients)
+        print(f"   • Осталось в буферах клиентов: {pending}, отброшено при переполнении: {dropped}")
+
+    def report(self, elapsed, received=None):
+        """Итоги. received - показаний, дошедших до сервера (известно только для локального сервера)"""
+        print("\nRESULT: Итоги воспроизведения")
+        print(f"   • Длительность: {elapsed:.2f} с")
+        print(f"   • Передано клиентами: {self.sent_readings} ({self.sent_readings / elapsed:.0f}/с)")
+        if received is None:
+            print("   • Прием сервером не измерен (внешний сервер)")
+        else:
+            # Пропускная способность - по приему сервером: UDP теряет датаграммы без ошибок
+            span = (self.last_arrival - self.started_at) if self.last_arrival else elapsed
+            lost = self.sent_readings - received
+            share = lost / self.sent_readings * 100 if self.sent_readings else 0.0
+            print(f"   • Принято сервером: {received} ({received / max(span, elapsed, 1e-9):.0f}/с), "
+                  f"потеряно {lost} ({share:.1f}%)")
+        print(f"   • Отправлено пакетов: {self.sent_batches} ({self.sent_batches / elapsed:.1f}/с), "
+              f"в буфер без связи: {self.buffered_batches}, ошибок: {self.failed_batches}")
+        if self.lags:
+            lags = sorted(self.lags)
+            print(f"   • Задержка до сервера, мс: p50 {percentile(lags, 0.5) * 1000:.1f}, "
+                  f"p95 {percentile(lags, 0.95) * 1000:.1f}, p99 {percentile(lags, 0.99) * 1000:.1f}, "
+                  f"max {lags[-1] * 1000:.1f} ({len(lags)} замеров после объединения записей)")
+        if self.restarted_at is not None:
+            self.report_reconnects()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Ускоренное воспроизведение трасс датчиков через клиент")
+    parser.add_argument('--pcs', type=int, default=10, help="число ПК")
+    parser.add_argument('--speed', type=float, default=10, help="ускорение, 0 - максимально быстро")
+    parser.add_argument('--duration', type=float, default=600, help="длительность синтетической трассы, с")
+    parser.add_argument('--interval', type=float, default=10, help="интервал синтетической трассы, с")
+    parser.add_argument('--recording', nargs='*', default=[],
+                        help="файлы записи tempdata, раздаются ПК по кругу")
+    parser.add_argument('--transport', choices=('opcua', 'snapshot', 'udp'), default='opcua')
+    parser.add_argument('--server', help="URL внешнего сервера (по умолчанию запускается локальный)")
+    parser.add_argument('--port', type=int, default=4850, help="порт локального сервера")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--restart-at', type=float,
+                        help="остановить локальный сервер через указанное время от начала (с реального времени)")
+    parser.add_argument('--downtime', type=float, default=5, help="сколько сервер не работает при перезапуске, с")
+    parser.add_argument('--reconnect', choices=('jitter', 'fixed'), default='jitter',
+                        help="jitter - экспоненциальная пауза с разбросом, fixed - прежняя сетка reconnect-interval")
+    parser.add_argument('--reconnect-interval', type=float, default=1, help="базовая пауза переподключения, с")
+    parser.add_argument('--max-reconnect-interval', type=float, default=8)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.recording:
+        recorded = [recorded_trace(path) for path in args.recording]
+        traces = [recorded[i % len(recorded)] for i in range(args.pcs)]
+    else:
+        traces = [synthetic_trace(args.seed + i, args.duration, args.interval) for i in range(args.pcs)]
+
+    server = None
+    url = args.server
+    udp_port = args.port + 1
+    if url is None:
+        url = f"opc.tcp://127.0.0.1:{args.port}/freeopcua/server/"
+        server = TemperatureOPCUAServer(
+            url, udp_host="127.0.0.1", udp_port=udp_port if args.transport == 'udp' else None
+        )
+        with redirect_stdout(io.StringIO()):
+            await server.initialize()
+            await server.start()
+
+    if args.reconnect == 'fixed':
+        reconnect = {"reconnect_interval": args.reconnect_interval,
+                     "max_reconnect_interval": args.reconnect_interval, "reconnect_jitter": False}
+    else:
+        reconnect = {"reconnect_interval": args.reconnect_interval,
+                     "max_reconnect_interval": args.max_reconnect_interval, "reconnect_jitter": True}
+    driver = ReplayDriver(url, traces, args.speed, args.transport, udp_port, reconnect)
+    ingest_task = None
+    restart_task = None
+    try:
+        if server:
+            await driver.prepare_server(server)
+            ingest_task = asyncio.create_task(server.ingest_loop())
+            if args.restart_at is not None:
+                restart_task = asyncio.create_task(
+                    driver.restart_server(server, ingest_task, args.restart_at, args.downtime))
+        elapsed = await driver.run()
+        if restart_task:
+            ingest_task = await restart_task
+        if server:
+            # Даем очереди приема обработать последние записи
+            await asyncio.sleep(server.ingest.batch_window * 2)
+        metrics = server.metrics() if server else None
+        # Дошедшие до сервера: принятые очередью, в том числе замененные более новыми
+        driver.report(elapsed, metrics['accepted'] + metrics['coalesced'] + metrics['dropped'] if metrics else None)
+        if server:
+            print(f"   • Сервер: принято {metrics['accepted']}, объединено {metrics['coalesced']}, "
+                  f"отброшено {metrics['dropped']}, пакетов {metrics['batches']}")
+            latency = server.latency_total.summary()
+            print(f"   • Гистограмма задержек сервера, мс: p50 ≤{latency['p50'] * 1000:.0f}, "
+                  f"p95 ≤{latency['p95'] * 1000:.0f}, p99 ≤{latency['p99'] * 1000:.0f}, "
+                  f"max {latency['max'] * 1000:.1f} ({latency['count']} показаний)")
+    finally:
+        if ingest_task:
+            ingest_task.cancel()
+        if server:
+            with redirect_stdout(io.StringIO()):
+                await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
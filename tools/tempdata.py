@@ -1,9 +1,14 @@
-import clr
 import os
 import sys
 import ctypes
 import threading
 import time
+import json
+import mmap
+import struct
+import argparse
+from array import array
+from datetime import datetime
 from collections import defaultdict, deque
 
 hwtypes = ['Mainboard','SuperIO','CPU','RAM','GpuNvidia','GpuAti','TBalancer','Heatmaster','HDD']
@@ -24,13 +29,15 @@ def run_as_admin():
             # Получаем путь к текущему скрипту
             script_path = os.path.abspath(sys.argv[0])
             
-            # Запускаем скрипт с правами администратора
+            # Запускаем скрипт с правами администратора с теми же аргументами и каталогом
+            # (иначе относительный путь --record указывал бы в System32)
+            arguments = " ".join(f'"{argument}"' for argument in [script_path] + sys.argv[1:])
             ctypes.windll.shell32.ShellExecuteW(
                 None, 
                 "runas", 
                 sys.executable, 
-                f'"{script_path}"', 
-                None, 
+                arguments, 
+                os.getcwd(), 
                 1
             )
             return False
@@ -55,6 +62,9 @@ def unblock_file(file_path):
         return False
 
 def initialize_openhardwaremonitor():
+    # pythonnet нужен только для чтения датчиков, чтение записей работает и без него
+    import clr
+    
     try:
         # Попробуйте разные пути
         possible_paths = [
@@ -96,22 +106,28 @@ def initialize_openhardwaremonitor():
         print(f"Тип ошибки: {type(e)}")
         raise
 
-def fetch_stats(handle):
+def fetch_stats(handle, readings=None):
+    """Опрос датчиков. Если передан словарь readings, показания сохраняются в него вместо вывода"""
     for i in handle.Hardware:
         i.Update()
         for sensor in i.Sensors:
-            parse_sensor(sensor)
+            parse_sensor(sensor, readings)
         for j in i.SubHardware:
             j.Update()
             for subsensor in j.Sensors:
-                parse_sensor(subsensor)
+                parse_sensor(subsensor, readings)
 
-def parse_sensor(sensor):
+def parse_sensor(sensor, readings=None):
     if sensor.Value and str(sensor.SensorType) == 'Temperature':
         temperature = float(sensor.Value)
         
         # Фильтруем некорректные значения (например, -13.5°C)
         if temperature > -10 and temperature < 150:
+            if readings is not None:
+                name = u'{} {} #{} {}'.format(hwtypes[sensor.Hardware.HardwareType],
+                                              sensor.Hardware.Name, sensor.Index, sensor.Name)
+                readings[name] = temperature
+                return
             result = u'{} {} Temperature Sensor #{} {} - {}\u00B0C'\
                     .format(hwtypes[sensor.Hardware.HardwareType], 
                             sensor.Hardware.Name, sensor.Index, 
@@ -119,7 +135,252 @@ def parse_sensor(sensor):
                     )
             print(result)
 
+# Формат файла записи (.tsr), все числа little-endian:
+#   заголовок:  FILE_MAGIC, длина JSON (uint32), JSON {"version", "sensors", "created"}, выравнивание до 8
+#   блоки:      BLOCK_HEADER (магия, строк, столбцов, время первой и последней строки),
+#               время строк float64[строк], затем по столбцу на датчик int16[строк]
+#               (десятые доли °C, MISSING_VALUE - нет показания), выравнивание до 8
+#   индекс:     INDEX_ENTRY на каждый блок (смещение, строк, время первой и последней строки)
+#   окончание:  TRAILER (смещение индекса, число блоков, INDEX_MAGIC)
+# Файл без индекса (обрыв записи) читается последовательным обходом блоков.
+FILE_MAGIC = b'TSR1'
+BLOCK_MAGIC = b'BLK1'
+INDEX_MAGIC = b'TSRI'
+FILE_VERSION = 1
+BLOCK_HEADER = struct.Struct('<4sIIdd')
+INDEX_ENTRY = struct.Struct('<QI4xdd')
+TRAILER = struct.Struct('<QI4s')
+MISSING_VALUE = -32768
+VALUE_SCALE = 10
+
+def _padding(size):
+    return b'\0' * (-size % 8)
+
+class SensorRecorder:
+    """Запись показаний в столбцовые файлы с буферизацией блоков и ротацией"""
+    def __init__(self, directory, block_rows=600, max_block_seconds=60, max_file_bytes=64 * 1024 * 1024,
+                 max_file_seconds=3600):
+        self.directory = directory
+        self.block_rows = block_rows  # Строк в блоке: одна запись на диск на блок
+        # Блок пишется не реже, чем раз в max_block_seconds: при сбое или отключении
+        # питания теряются показания не более чем за это время
+        self.max_block_seconds = max_block_seconds
+        self.max_file_bytes = max_file_bytes
+        self.max_file_seconds = max_file_seconds
+        os.makedirs(directory, exist_ok=True)
+        
+        self.file = None
+        self.path = None
+        self.sensors = []
+        self.columns_by_name = {}
+        self.opened_at = 0.0
+        self.index = []  # [(смещение, строк, время первой, время последней)]
+        
+        self.times = array('d')
+        self.columns = []  # array('h') на датчик
+    
+    def _open(self, sensors, timestamp):
+        self.sensors = list(sensors)
+        self.columns_by_name = {name: i for i, name in enumerate(self.sensors)}
+        self.columns = [array('h') for _ in self.sensors]
+        self.index = []
+        self.opened_at = timestamp
+        
+        stamp = datetime.fromtimestamp(timestamp).strftime('%Y%m%d_%H%M%S_%f')
+        self.path = os.path.join(self.directory, f"temps_{stamp}.tsr")
+        header = json.dumps({
+            'version': FILE_VERSION,
+            'sensors': self.sensors,
+            'created': timestamp
+        }, ensure_ascii=False).encode('utf-8')
+        self.file = open(self.path, 'wb')
+        prefix = FILE_MAGIC + struct.pack('<I', len(header)) + header
+        self.file.write(prefix + _padding(len(prefix)))
+    
+    def record(self, timestamp, readings):
+        """Добавление строки показаний {имя датчика: температура}"""
+        if self.file is None:
+            self._open(sorted(readings), timestamp)
+        elif any(name not in self.columns_by_name for name in readings):
+            # Появился новый датчик - продолжаем в новом файле с расширенной схемой
+            self.rotate(timestamp, self.sensors + sorted(set(readings) - set(self.sensors)))
+        elif timestamp - self.opened_at >= self.max_file_seconds or self.file.tell() >= self.max_file_bytes:
+            self.rotate(timestamp)
+        
+        self.times.append(timestamp)
+        for name, column in zip(self.sensors, self.columns):
+            value = readings.get(name)
+            column.append(MISSING_VALUE if value is None else round(value * VALUE_SCALE))
+        
+        if len(self.times) >= self.block_rows or timestamp - self.times[0] >= self.max_block_seconds:
+            self.flush()
+    
+    def flush(self):
+        """Запись накопленного блока на диск"""
+        rows = len(self.times)
+        if not rows or self.file is None:
+            return
+        offset = self.file.tell()
+        parts = [BLOCK_HEADER.pack(BLOCK_MAGIC, rows, len(self.columns), self.times[0], self.times[-1]),
+                 self.times.tobytes()]
+        parts.extend(column.tobytes() for column in self.columns)
+        size = sum(len(part) for part in parts)
+        parts.append(_padding(size))
+        self.file.write(b''.join(parts))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.index.append((offset, rows, self.times[0], self.times[-1]))
+        
+        self.times = array('d')
+        self.columns = [array('h') for _ in self.sensors]
+    
+    def rotate(self, timestamp=None, sensors=None):
+        """Закрытие текущего файла и начало нового"""
+        if timestamp is None:
+            timestamp = time.time()
+        self.close()
+        self._open(self.sensors if sensors is None else sensors, timestamp)
+    
+    def close(self):
+        """Сброс буфера и запись индекса блоков"""
+        if self.file is None:
+            return
+        self.flush()
+        index_offset = self.file.tell()
+        self.file.write(b''.join(INDEX_ENTRY.pack(*entry) for entry in self.index))
+        self.file.write(TRAILER.pack(index_offset, len(self.index), INDEX_MAGIC))
+        self.file.close()
+        self.file = None
+
+class RecordingReader:
+    """Чтение файла записи через отображение в память. Поддерживает with:
+    with RecordingReader(path) as reader: ..."""
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        
+        if bytes(self._view[:4]) != FILE_MAGIC:
+            raise ValueError(f"{path}: не является файлом записи температуры")
+        header_len = struct.unpack_from('<I', self._map, 4)[0]
+        header = json.loads(bytes(self._view[8:8 + header_len]).decode('utf-8'))
+        self.sensors = header['sensors']
+        self.created = header['created']
+        self._data_start = 8 + header_len + (-(8 + header_len) % 8)
+        self.index = self._read_index()
+    
+    def _read_index(self):
+        """Индекс из окончания файла, либо последовательный обход блоков"""
+        if len(self._map) >= self._data_start + TRAILER.size:
+            index_offset, count, magic = TRAILER.unpack_from(self._map, len(self._map) - TRAILER.size)
+            if magic == INDEX_MAGIC:
+                return [INDEX_ENTRY.unpack_from(self._map, index_offset + i * INDEX_ENTRY.size)
+                        for i in range(count)]
+        
+        index = []
+        offset = self._data_start
+        while offset + BLOCK_HEADER.size <= len(self._map):
+            magic, rows, cols, t_first, t_last = BLOCK_HEADER.unpack_from(self._map, offset)
+            size = BLOCK_HEADER.size + rows * 8 + rows * cols * 2
+            if magic != BLOCK_MAGIC or offset + size > len(self._map):
+                break
+            index.append((offset, rows, t_first, t_last))
+            offset += size + (-size % 8)
+        return index
+    
+    def time_range(self):
+        if not self.index:
+            return None
+        return self.index[0][2], self.index[-1][3]
+    
+    def blocks(self, t_start=None, t_end=None):
+        """Блоки, пересекающие интервал: (время строк, {датчик: столбец int16 в десятых °C}).
+        Столбцы - представления memoryview прямо на отображение файла, без копирования.
+        Для использования после close() их нужно скопировать (например, list(column))"""
+        for offset, rows, t_first, t_last in self.index:
+            if (t_start is not None and t_last < t_start) or (t_end is not None and t_first > t_end):
+                continue
+            cols = BLOCK_HEADER.unpack_from(self._map, offset)[2]
+            position = offset + BLOCK_HEADER.size
+            times = self._view[position:position + rows * 8].cast('d')
+            position += rows * 8
+            columns = {}
+            for name in self.sensors[:cols]:
+                columns[name] = self._view[position:position + rows * 2].cast('h')
+                position += rows * 2
+            yield times, columns
+    
+    def read_sensor(self, name, t_start=None, t_end=None):
+        """Показания одного датчика: ([время], [температура])"""
+        times_out, temps_out = [], []
+        for times, columns in self.blocks(t_start, t_end):
+            column = columns.get(name)
+            if column is None:
+                continue
+            for t, value in zip(times, column):
+                if value != MISSING_VALUE and (t_start is None or t >= t_start) and (t_end is None or t <= t_end):
+                    times_out.append(t)
+                    temps_out.append(value / VALUE_SCALE)
+        return times_out, temps_out
+    
+    def replay(self, t_start=None, t_end=None):
+        """Построчное воспроизведение: (время, {датчик: температура})"""
+        for times, columns in self.blocks(t_start, t_end):
+            for row, t in enumerate(times):
+                if (t_start is not None and t < t_start) or (t_end is not None and t > t_end):
+                    continue
+                yield t, {name: column[row] / VALUE_SCALE
+                          for name, column in columns.items() if column[row] != MISSING_VALUE}
+    
+    def close(self):
+        """Закрытие файла. Если представления из blocks() еще существуют, отображение
+        освобождается после их удаления, а до тех пор они остаются действительными"""
+        if self._map is None:
+            return
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+        self._map = None
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+def dump_recording(path):
+    """Краткая сводка по файлу записи"""
+    reader = RecordingReader(path)
+    try:
+        time_range = reader.time_range()
+        rows = sum(entry[1] for entry in reader.index)
+        print(f"Файл: {path}")
+        print(f"Датчиков: {len(reader.sensors)}, блоков: {len(reader.index)}, строк: {rows}")
+        if time_range:
+            print(f"Период: {datetime.fromtimestamp(time_range[0])} - {datetime.fromtimestamp(time_range[1])}")
+        for name in reader.sensors:
+            _, temps = reader.read_sensor(name)
+            if temps:
+                print(f"  {name}: min {min(temps):.1f}, max {max(temps):.1f}, последнее {temps[-1]:.1f}\u00B0C")
+    finally:
+        reader.close()
+
 def main():
+    parser = argparse.ArgumentParser(description="Чтение датчиков температуры")
+    parser.add_argument('--record', metavar='DIR', help="записывать показания в каталог вместо вывода")
+    parser.add_argument('--interval', type=float, default=10, help="интервал опроса, секунд")
+    parser.add_argument('--dump', metavar='FILE', help="вывести сводку по файлу записи и выйти")
+    args = parser.parse_args()
+    
+    if args.dump:
+        dump_recording(args.dump)
+        return
+    
     # Проверяем права администратора и запрашиваем их при необходимости
     if not run_as_admin():
         print("Перезапуск с правами администратора...")
@@ -128,17 +389,32 @@ def main():
     print("Инициализация OpenHardwareMonitor...")
     HardwareHandle = initialize_openhardwaremonitor()
     
+    recorder = SensorRecorder(args.record) if args.record else None
+    
     print("Запуск мониторинга температуры...")
+    if recorder:
+        print(f"Запись показаний в {args.record} каждые {args.interval} с")
     print("Нажмите Ctrl+C для завершения программы.")
     
     try:
+        next_time = time.monotonic()
         while True:
-            fetch_stats(HardwareHandle)
-            time.sleep(10)  # Обновление каждую секунду
+            if recorder:
+                readings = {}
+                fetch_stats(HardwareHandle, readings)
+                if readings:
+                    recorder.record(time.time(), readings)
+            else:
+                fetch_stats(HardwareHandle)
+            # Опрос по расписанию, без накопления задержки самого опроса
+            next_time += args.interval
+            time.sleep(max(next_time - time.monotonic(), 0))
             
     except KeyboardInterrupt:
         print("\nПрограмма прервана пользователем.")
     finally:
+        if recorder:
+            recorder.close()
         print("Завершение работы...")
 
 if __name__ == "__main__":
@@ -1,34 +1,138 @@
-import clr
 import os
+import math
+import asyncio
+import argparse
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 from datetime import datetime, timedelta
 import threading
 import time
 from collections import defaultdict, deque
+import numpy as np
 
 hwtypes = ['Mainboard','SuperIO','CPU','RAM','GpuNvidia','GpuAti','TBalancer','Heatmaster','HDD']
 
+NAMESPACE = "http://university.temperature.monitoring"
+
+class RingBuffer:
+    """Кольцевой буфер точек (время, температура) с непрерывным представлением последних точек"""
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Каждая точка пишется дважды (i и i + size), поэтому последние точки всегда
+        # лежат подряд. Запас size > capacity гарантирует, что ближайшие capacity
+        # записей не затронут уже выданные представления
+        self.size = 2 * capacity
+        self.times = np.zeros(2 * self.size)
+        self.temps = np.zeros(2 * self.size)
+        self.head = 0  # Всего записано точек
+        self.count = 0
+    
+    def append(self, t, value):
+        """Добавление точки. Возвращает вытесненную точку или None"""
+        evicted = None
+        if self.count == self.capacity:
+            oldest = (self.head - self.capacity) % self.size
+            evicted = (self.times[oldest], self.temps[oldest])
+        else:
+            self.count += 1
+        pos = self.head % self.size
+        self.times[pos] = self.times[pos + self.size] = t
+        self.temps[pos] = self.temps[pos + self.size] = value
+        self.head += 1
+        return evicted
+    
+    def view(self):
+        start = (self.head - self.count) % self.size
+        return self.times[start:start + self.count], self.temps[start:start + self.count]
+
+class TieredSeries:
+    """Многоуровневая история датчика: свежие точки целиком, старые - min/max по корзинам"""
+    def __init__(self, recent_points=200, tier_points=400, tiers=3, bucket=8):
+        self.bucket = bucket
+        self.levels = [RingBuffer(recent_points)] + [RingBuffer(tier_points) for _ in range(tiers)]
+        self.pending = [[] for _ in range(tiers)]  # Точки, вытесненные с уровня и ждущие свертки
+    
+    def append(self, t, value):
+        self._push(0, t, value)
+    
+    def _push(self, level, t, value):
+        evicted = self.levels[level].append(t, value)
+        if evicted is None or level + 1 >= len(self.levels):
+            return
+        pending = self.pending[level]
+        pending.append(evicted)
+        if len(pending) < self.bucket:
+            return
+        # Корзина заполнена - на следующий уровень уходят минимум и максимум в порядке времени
+        low = min(pending, key=lambda point: point[1])
+        high = max(pending, key=lambda point: point[1])
+        pending.clear()
+        for point in sorted({low, high}):
+            self._push(level + 1, *point)
+    
+    def views(self):
+        """Представления уровней от самых старых данных к свежим"""
+        return [level.view() for level in reversed(self.levels) if level.count]
+
+def minmax_downsample(times, temps, max_points):
+    """Прореживание до max_points точек с сохранением минимумов и максимумов"""
+    n = len(times)
+    if n <= max_points:
+        return times, temps
+    per_bucket = -(-n // (max_points // 2))
+    buckets = -(-n // per_bucket)
+    # Неполная последняя корзина добивается последним значением, индексы которого
+    # затем приводятся к последней точке
+    padded = np.empty(buckets * per_bucket)
+    padded[:n] = temps
+    padded[n:] = temps[-1]
+    shaped = padded.reshape(buckets, per_bucket)
+    offsets = np.arange(buckets) * per_bucket
+    low = offsets + shaped.argmin(axis=1)
+    high = offsets + shaped.argmax(axis=1)
+    index = np.unique(np.minimum(np.concatenate([low, high]), n - 1))
+    return times[index], temps[index]
+
 class TemperatureMonitor:
-    def __init__(self, max_points=100):
+    def __init__(self, max_points=100, tier_points=400, tiers=3, bucket=8):
         self.max_points = max_points
-        self.data = defaultdict(lambda: {'times': deque(maxlen=max_points), 'temps': deque(maxlen=max_points)})
+        # Полная частота для последних max_points точек, затем уровни с шагом x bucket
+        self.data = defaultdict(lambda: TieredSeries(max_points, tier_points, tiers, bucket))
         self.start_time = datetime.now()
+        self.start_unix = self.start_time.timestamp()
         self.lock = threading.Lock()
         self.running = True
         
-    def add_data_point(self, sensor_name, temperature):
+    def add_data_point(self, sensor_name, temperature, timestamp=None):
+        """Добавление показания. timestamp - время измерения UNIX (по умолчанию - текущее)"""
         with self.lock:
-            current_time = datetime.now()
-            elapsed_seconds = (current_time - self.start_time).total_seconds()
+            if timestamp is None:
+                current_time = datetime.now()
+                elapsed_seconds = (current_time - self.start_time).total_seconds()
+            else:
+                elapsed_seconds = timestamp - self.start_unix
             
-            self.data[sensor_name]['times'].append(elapsed_seconds)
-            self.data[sensor_name]['temps'].append(temperature)
+            self.data[sensor_name].append(elapsed_seconds, temperature)
+    
+    def elapsed(self):
+        """Секунды с начала мониторинга"""
+        return (datetime.now() - self.start_time).total_seconds()
     
     def get_data_copy(self):
+        """Данные всех датчиков. Под блокировкой берутся только представления массивов"""
         with self.lock:
-            return {name: {'times': list(info['times']), 'temps': list(info['temps'])} 
-                   for name, info in self.data.items()}
+            views = {name: series.views() for name, series in self.data.items()}
+        
+        result = {}
+        for name, levels in views.items():
+            if len(levels) == 1:
+                times, temps = levels[0]
+            else:
+                # Склейка уровней выполняется уже без блокировки
+                times = np.concatenate([level[0] for level in levels])
+                temps = np.concatenate([level[1] for level in levels])
+            result[name] = {'times': times, 'temps': temps}
+        return result
 
 def unblock_file(file_path):
     try:
@@ -40,6 +144,9 @@ def unblock_file(file_path):
         print(f"Ошибка при разблокировке файла: {e}")
 
 def initialize_openhardwaremonitor():
+    # pythonnet нужен только для чтения датчиков, отрисовка работает и без него
+    import clr
+    
     file = rf'{os.getcwd()}\ohm\OpenHardwareMonitorLib.dll'
     unblock_file(file)
     clr.AddReference(file)
@@ -92,6 +199,97 @@ def data_collection_thread(handle, monitor, interval=1.0):
             print(f"Ошибка при сборе данных: {e}")
             time.sleep(interval)
 
+def pc_of(sensor_name):
+    """ПК удаленного датчика по имени вида B1_R101_P3 CPU_0"""
+    return sensor_name.split(' ', 1)[0]
+
+def pc_sort_key(pc_name):
+    """Порядок ПК по зданию, комнате и номеру (B1_R101_P10 после B1_R101_P9)"""
+    return tuple(int(part[1:]) if part[1:].isdigit() else 0 for part in pc_name.split('_'))
+
+def sensor_sort_key(sensor_name):
+    return pc_sort_key(pc_of(sensor_name)), sensor_name
+
+class RemoteFeed:
+    """Подписка на все датчики здания или комнаты на сервере и подача значений в монитор.
+    Одна подписка OPC UA на все узлы, сервер сам присылает изменения"""
+    def __init__(self, url, monitor, building, room=None, period=1000, rescan_interval=60):
+        self.url = url
+        self.monitor = monitor
+        self.prefix = f"B{building}_R{room}_" if room is not None else f"B{building}_R"
+        self.period = period  # Период публикации подписки (мс)
+        self.rescan_interval = rescan_interval  # Поиск новых ПК на сервере (с)
+        self.names = {}  # {NodeID узла: имя ряда "B1_R101_P3 CPU_0"}
+        self.notifications = 0
+    
+    def datachange_notification(self, node, val, data):
+        name = self.names.get(node.nodeid.Identifier)
+        data_value = data.monitored_item.Value
+        # Пропускаем смену качества (сервер помечает устаревшие датчики) и незаписанные узлы
+        if name is None or not data_value.StatusCode.is_good() or not val or val <= 0:
+            return
+        self.notifications += 1
+        timestamp = data_value.SourceTimestamp
+        self.monitor.add_data_point(name, float(val), timestamp.timestamp() if timestamp else None)
+
+    def status_change_notification(self, status):
+        print(f"Состояние подписки изменилось: {status.Status}")
+
+    async def discover(self, client, namespace_idx):
+        """Узлы датчиков выбранного здания/комнаты (один запрос обзора)"""
+        root = await client.nodes.objects.get_child(f"{namespace_idx}:TemperatureSensors")
+        found = []
+        for description in await root.get_children_descriptions():
+            browse_name = description.BrowseName.Name
+            if not browse_name.startswith(self.prefix) or browse_name.endswith('_Snapshot'):
+                continue
+            if description.NodeId.Identifier in self.names:
+                continue
+            # B1_R101_P3_CPU_0 -> "B1_R101_P3 CPU_0"
+            parts = browse_name.split('_', 3)
+            if len(parts) < 4:
+                continue
+            self.names[description.NodeId.Identifier] = f"{'_'.join(parts[:3])} {parts[3]}"
+            found.append(client.get_node(description.NodeId))
+        return found
+    
+    async def run(self):
+        from asyncua import Client
+        
+        delay = 1
+        while self.monitor.running:
+            client = Client(self.url)
+            try:
+                await client.connect()
+                namespace_idx = await client.get_namespace_index(NAMESPACE)
+                self.names = {}
+                subscription = await client.create_subscription(self.period, self)
+                nodes = await self.discover(client, namespace_idx)
+                if nodes:
+                    await subscription.subscribe_data_change(nodes)
+                print(f"Подписка на {len(nodes)} датчиков ({self.prefix}*)")
+                delay = 1
+                
+                while self.monitor.running:
+                    await asyncio.sleep(self.rescan_interval)
+                    nodes = await self.discover(client, namespace_idx)
+                    if nodes:
+                        await subscription.subscribe_data_change(nodes)
+                        print(f"Добавлено датчиков в подписку: {len(nodes)}")
+            except Exception as e:
+                print(f"Ошибка связи с сервером: {e}, повтор через {delay} с")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                try:
+                    await client.disconnect()
+                except Exception:
+                    pass
+
+def remote_collection_thread(feed):
+    """Поток с циклом событий для подписки OPC UA (окно графика остается в главном потоке)"""
+    asyncio.run(feed.run())
+
 def setup_plot():
     """Настройка графика"""
     plt.style.use('dark_background')
@@ -103,6 +301,299 @@ def setup_plot():
     
     return fig, ax
 
+ALL_COLORS = ['#ff6b6b', '#4ecdc4', '#95e1d3', '#fce38a', '#ff8e53', '#45b7aa', '#a8e6cf', '#f38ba8']
+
+def short_sensor_name(sensor_name):
+    """Сокращенное имя датчика для легенды"""
+    short_name = sensor_name.split(' - ')[-1]
+    if 'CPU' in sensor_name:
+        short_name = f"CPU: {short_name}"
+    elif 'GPU' in sensor_name:
+        short_name = f"GPU: {short_name}"
+    elif 'HDD' in sensor_name:
+        short_name = f"HDD: {short_name.split()[-1] if len(short_name.split()) > 1 else short_name}"
+    return short_name
+
+class FrameStatsMixin:
+    """Статистика времени отрисовки для видов с очередью frame_times (секунды)"""
+    def frame_time_stats(self):
+        """Среднее и максимальное время кадра (мс)"""
+        if not self.frame_times:
+            return 0.0, 0.0
+        return (sum(self.frame_times) / len(self.frame_times) * 1000, max(self.frame_times) * 1000)
+
+class LivePlot(FrameStatsMixin):
+    """Отрисовка с постоянными линиями датчиков и блиттингом статического фона"""
+    def __init__(self, fig, ax, monitor, x_headroom=0.25, y_margin=5, max_draw_points=1000):
+        self.fig = fig
+        self.ax = ax
+        self.monitor = monitor
+        self.max_draw_points = max_draw_points  # Не больше точек на линию, чем пикселей по ширине
+        self.x_headroom = x_headroom  # Запас по оси времени (доля видимого окна)
+        self.y_margin = y_margin
+        self.lines = {}  # {sensor_name: Line2D}
+        self.background = None
+        self.frame_times = deque(maxlen=100)  # Время отрисовки кадров (секунды)
+        self.full_redraws = 0
+        fig.canvas.mpl_connect('draw_event', self._on_draw)
+    
+    def _on_draw(self, event):
+        """Сохранение фона после полной перерисовки"""
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_lines()
+    
+    def _draw_lines(self):
+        for line in self.lines.values():
+            self.ax.draw_artist(line)
+    
+    def _add_line(self, sensor_name):
+        color = ALL_COLORS[len(self.lines) % len(ALL_COLORS)]
+        line, = self.ax.plot([], [], label=short_sensor_name(sensor_name),
+                             linewidth=2, color=color, alpha=0.8, animated=True)
+        self.lines[sensor_name] = line
+    
+    def _limits_exceeded(self, data_copy):
+        """Проверка выхода данных за текущие пределы осей с выбором новых пределов"""
+        x_min = min(d['times'][0] for d in data_copy.values())
+        x_max = max(d['times'][-1] for d in data_copy.values())
+        y_min = min(d['temps'].min() for d in data_copy.values())
+        y_max = max(d['temps'].max() for d in data_copy.values())
+        
+        changed = False
+        left, right = self.ax.get_xlim()
+        if x_max > right or x_min < left - (right - left):
+            span = max(x_max - x_min, 10.0)
+            self.ax.set_xlim(x_min, x_max + span * self.x_headroom)
+            changed = True
+        bottom, top = self.ax.get_ylim()
+        if y_min < bottom or y_max > top:
+            self.ax.set_ylim(y_min - self.y_margin, y_max + self.y_margin)
+            changed = True
+        return changed
+    
+    def update(self, frame=None):
+        """Обновление кадра: меняются только данные линий"""
+        started = time.perf_counter()
+        data_copy = {name: data for name, data in self.monitor.get_data_copy().items()
+                     if len(data['times']) > 1}
+        
+        full_redraw = self.background is None
+        new_sensors = False
+        for sensor_name, sensor_data in data_copy.items():
+            if sensor_name not in self.lines:
+                # Новый датчик - нужна новая легенда и полная перерисовка
+                self._add_line(sensor_name)
+                new_sensors = True
+            self.lines[sensor_name].set_data(*minmax_downsample(
+                sensor_data['times'], sensor_data['temps'], self.max_draw_points))
+        
+        if data_copy and self._limits_exceeded(data_copy):
+            full_redraw = True
+        
+        if new_sensors:
+            self.ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left', fontsize=8)
+            self.fig.tight_layout()
+            full_redraw = True
+        
+        if full_redraw:
+            self.fig.canvas.draw()
+            self.full_redraws += 1
+        else:
+            self.fig.canvas.restore_region(self.background)
+            self._draw_lines()
+            self.fig.canvas.blit(self.fig.bbox)
+        
+        self.frame_times.append(time.perf_counter() - started)
+        return list(self.lines.values())
+    
+class HeatmapPlot(FrameStatsMixin):
+    """Тепловая карта: строка на датчик, столбец на интервал времени.
+    Одно изображение вместо сотен линий, время кадра почти не зависит от числа рядов"""
+    def __init__(self, fig, ax, monitor, window=600, columns=120, vmin=20, vmax=90, hold=30):
+        self.fig = fig
+        self.ax = ax
+        self.monitor = monitor
+        self.window = window  # Видимый интервал (с)
+        self.columns = columns
+        self.bin = window / columns
+        self.hold = max(1, math.ceil(hold / self.bin))  # Сколько столбцов держим последнее значение
+        self.vmin = vmin
+        self.vmax = vmax
+        self.rows = []  # Имена датчиков в порядке строк
+        self.image = None
+        self.background = None
+        self.frame_times = deque(maxlen=100)
+        self.full_redraws = 0
+        fig.canvas.mpl_connect('draw_event', self._on_draw)
+    
+    def _on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        if self.image is not None:
+            self.ax.draw_artist(self.image)
+    
+    def _layout(self, rows):
+        """Перестройка строк при появлении датчиков: подписи - по одной на ПК"""
+        self.rows = rows
+        self.matrix = np.full((len(rows), self.columns), np.nan)
+        self.column_index = np.arange(self.columns)
+        extent = (-self.window, 0, len(rows), 0)
+        if self.image is None:
+            cmap = plt.get_cmap('inferno').copy()
+            cmap.set_bad('#202020')
+            self.image = self.ax.imshow(self.matrix, aspect='auto', interpolation='nearest', cmap=cmap,
+                                        vmin=self.vmin, vmax=self.vmax, extent=extent, animated=True)
+            self.fig.colorbar(self.image, ax=self.ax, label='Температура (°C)')
+            self.ax.set_xlabel('Секунд назад')
+            self.ax.set_ylabel('ПК')
+        else:
+            self.image.set_data(self.matrix)
+            self.image.set_extent(extent)
+        
+        ticks, labels = [], []
+        for row, name in enumerate(rows):
+            if row == 0 or pc_of(name) != pc_of(rows[row - 1]):
+                ticks.append(row + 0.5)
+                labels.append(pc_of(name))
+        # Подписи не чаще, чем помещается по высоте
+        step = max(1, len(ticks) // 40)
+        self.ax.set_yticks(ticks[::step])
+        self.ax.set_yticklabels(labels[::step], fontsize=7)
+        self.ax.set_ylim(len(rows), 0)
+    
+    def _fill(self, data_copy, now):
+        """Раскладка показаний по столбцам времени с удержанием последнего значения"""
+        start = now - self.window
+        matrix = self.matrix
+        matrix.fill(np.nan)
+        for row, name in enumerate(self.rows):
+            sensor_data = data_copy.get(name)
+            if sensor_data is None:
+                continue
+            times = sensor_data['times']
+            first = max(np.searchsorted(times, start) - 1, 0)
+            columns = ((times[first:] - start) / self.bin).astype(int)
+            np.clip(columns, 0, self.columns - 1, out=columns)
+            matrix[row, columns] = sensor_data['temps'][first:]
+        
+        # Заполнение пропусков последним значением, но не дольше hold столбцов
+        known = ~np.isnan(matrix)
+        last = np.where(known, self.column_index, 0)
+        np.maximum.accumulate(last, axis=1, out=last)
+        filled = np.take_along_axis(matrix, last, axis=1)
+        filled[(self.column_index - last) > self.hold] = np.nan
+        return filled
+    
+    def update(self, frame=None):
+        started = time.perf_counter()
+        data_copy = self.monitor.get_data_copy()
+        
+        rows = sorted(data_copy, key=sensor_sort_key)
+        full_redraw = self.background is None
+        if rows != self.rows:
+            self._layout(rows)
+            full_redraw = True
+        self.image.set_data(self._fill(data_copy, self.monitor.elapsed()))
+        
+        if full_redraw:
+            self.fig.canvas.draw()
+            self.full_redraws += 1
+        else:
+            self.fig.canvas.restore_region(self.background)
+            self.ax.draw_artist(self.image)
+            self.fig.canvas.blit(self.fig.bbox)
+        
+        self.frame_times.append(time.perf_counter() - started)
+        return [self.image]
+
+class SmallMultiplesPlot(FrameStatsMixin):
+    """Малые графики: ячейка на ПК с линиями его датчиков, общие оси времени и температуры"""
+    def __init__(self, fig, monitor, window=600, max_draw_points=200, ylim=(20, 90)):
+        self.fig = fig
+        self.monitor = monitor
+        self.window = window
+        self.max_draw_points = max_draw_points  # Ячейки маленькие - точек нужно меньше
+        self.ylim = ylim
+        self.axes = {}  # {ПК: Axes}
+        self.lines = {}  # {датчик: Line2D}
+        self.background = None
+        self.frame_times = deque(maxlen=100)
+        self.full_redraws = 0
+        fig.canvas.mpl_connect('draw_event', self._on_draw)
+    
+    def _on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_lines()
+    
+    def _draw_lines(self):
+        for name, line in self.lines.items():
+            self.axes[pc_of(name)].draw_artist(line)
+    
+    def _layout(self, names):
+        """Сетка ячеек под текущий набор ПК"""
+        pcs = sorted({pc_of(name) for name in names}, key=pc_sort_key)
+        self.fig.clear()
+        self.axes = {}
+        self.lines = {}
+        cols = math.ceil(math.sqrt(len(pcs)))
+        rows = math.ceil(len(pcs) / cols)
+        first = None
+        for i, pc in enumerate(pcs):
+            ax = self.fig.add_subplot(rows, cols, i + 1, sharex=first, sharey=first)
+            if first is None:
+                first = ax
+                ax.set_xlim(-self.window, 0)
+                ax.set_ylim(*self.ylim)
+            ax.set_title(pc, fontsize=7, pad=2)
+            ax.tick_params(labelsize=6)
+            # Подписи осей только у крайних ячеек
+            if i % cols:
+                ax.tick_params(labelleft=False)
+            if i < len(pcs) - cols:
+                ax.tick_params(labelbottom=False)
+            ax.grid(True, alpha=0.2)
+            self.axes[pc] = ax
+        for name in sorted(names):
+            ax = self.axes[pc_of(name)]
+            color = ALL_COLORS[sum(1 for other in self.lines if pc_of(other) == pc_of(name)) % len(ALL_COLORS)]
+            self.lines[name], = ax.plot([], [], linewidth=1, color=color, alpha=0.9, animated=True)
+    
+    def update(self, frame=None):
+        started = time.perf_counter()
+        data_copy = self.monitor.get_data_copy()
+        now = self.monitor.elapsed()
+        
+        full_redraw = self.background is None
+        if set(data_copy) != set(self.lines):
+            self._layout(data_copy)
+            full_redraw = True
+        
+        low, high = self.ylim
+        for name, sensor_data in data_copy.items():
+            times = sensor_data['times']
+            first = np.searchsorted(times, now - self.window)
+            times, temps = minmax_downsample(times[first:], sensor_data['temps'][first:], self.max_draw_points)
+            # Время откладывается от текущего момента, поэтому оси не двигаются
+            self.lines[name].set_data(times - now, temps)
+            if len(temps):
+                low = min(low, temps.min())
+                high = max(high, temps.max())
+        
+        if (low, high) != self.ylim and self.axes:
+            self.ylim = (math.floor(low - 2), math.ceil(high + 2))
+            next(iter(self.axes.values())).set_ylim(*self.ylim)
+            full_redraw = True
+        
+        if full_redraw:
+            self.fig.canvas.draw()
+            self.full_redraws += 1
+        else:
+            self.fig.canvas.restore_region(self.background)
+            self._draw_lines()
+            self.fig.canvas.blit(self.fig.bbox)
+        
+        self.frame_times.append(time.perf_counter() - started)
+        return list(self.lines.values())
+
 def animate(frame, ax, monitor):
     """Функция анимации для обновления графика"""
     ax.clear()
@@ -122,22 +613,15 @@ def animate(frame, ax, monitor):
     }
     
     color_idx = 0
-    all_colors = ['#ff6b6b', '#4ecdc4', '#95e1d3', '#fce38a', '#ff8e53', '#45b7aa', '#a8e6cf', '#f38ba8']
     
     for sensor_name, sensor_data in data_copy.items():
         if len(sensor_data['times']) > 1:
             # Определяем цвет по типу датчика
-            sensor_color = all_colors[color_idx % len(all_colors)]
+            sensor_color = ALL_COLORS[color_idx % len(ALL_COLORS)]
             color_idx += 1
             
             # Сокращаем имя датчика для легенды
-            short_name = sensor_name.split(' - ')[-1]
-            if 'CPU' in sensor_name:
-                short_name = f"CPU: {short_name}"
-            elif 'GPU' in sensor_name:
-                short_name = f"GPU: {short_name}"
-            elif 'HDD' in sensor_name:
-                short_name = f"HDD: {short_name.split()[-1] if len(short_name.split()) > 1 else short_name}"
+            short_name = short_sensor_name(sensor_name)
             
             ax.plot(sensor_data['times'], sensor_data['temps'], 
                    label=short_name, linewidth=2, color=sensor_color, alpha=0.8)
@@ -156,12 +640,149 @@ def animate(frame, ax, monitor):
     
     plt.tight_layout()
 
+def benchmark_rendering(n_sensors=30, n_points=200, frames=50):
+    """Замер времени кадра обоих режимов отрисовки без окна (бэкенд Agg)"""
+    plt.switch_backend('Agg')
+    
+    results = {}
+    for mode in ('legacy', 'blit'):
+        monitor = TemperatureMonitor(max_points=n_points)
+        names = [f"CPU Test CPU - CPU Core #{i}" for i in range(n_sensors)]
+        
+        def add_points(step):
+            for i, name in enumerate(names):
+                monitor.add_data_point(name, 50 + 10 * math.sin(step / 10 + i))
+        
+        for step in range(n_points):
+            add_points(step)
+        
+        fig, ax = setup_plot()
+        plot = LivePlot(fig, ax, monitor) if mode == 'blit' else None
+        frame_times = []
+        for frame in range(frames):
+            add_points(n_points + frame)
+            started = time.perf_counter()
+            if plot:
+                plot.update(frame)
+            else:
+                animate(frame, ax, monitor)
+                fig.canvas.draw()
+            frame_times.append(time.perf_counter() - started)
+        plt.close(fig)
+        
+        # Первый кадр всегда полный, в среднее не включаем
+        steady = frame_times[1:] or frame_times
+        results[mode] = sum(steady) / len(steady) * 1000
+        print(f"BENCH: {mode}: {results[mode]:.2f} мс/кадр "
+              f"({n_sensors} датчиков x {n_points} точек, {frames} кадров)")
+    return results
+
+def benchmark_fleet(n_pcs=30, sensors_per_pc=10, frames=30, interval=1.0):
+    """Замер времени кадра видов для многих ПК (бэкенд Agg)"""
+    plt.switch_backend('Agg')
+    
+    n_points = 200
+    results = {}
+    for view in ('lines', 'multiples', 'heatmap'):
+        monitor = TemperatureMonitor(max_points=n_points)
+        names = [f"B1_R{100 + pc // 30}_P{pc % 30 + 1} CPU_{i}" for pc in range(n_pcs) for i in range(sensors_per_pc)]
+        # Показания за последние n_points интервалов, последнее - сейчас
+        base = monitor.start_unix + monitor.elapsed() - n_points * interval
+        
+        def add_points(step):
+            for i, name in enumerate(names):
+                monitor.add_data_point(name, 50 + 10 * math.sin(step / 10 + i), base + step * interval)
+        
+        for step in range(n_points):
+            add_points(step)
+        
+        if view == 'multiples':
+            fig = plt.figure(figsize=(16, 10))
+            plot = SmallMultiplesPlot(fig, monitor, window=n_points * interval)
+        else:
+            fig, ax = setup_plot()
+            if view == 'heatmap':
+                plot = HeatmapPlot(fig, ax, monitor, window=n_points * interval)
+            else:
+                plot = LivePlot(fig, ax, monitor)
+        frame_times = []
+        for frame in range(frames):
+            add_points(n_points + frame)
+            started = time.perf_counter()
+            plot.update(frame)
+            frame_times.append(time.perf_counter() - started)
+        plt.close(fig)
+        
+        steady = frame_times[1:] or frame_times
+        results[view] = sum(steady) / len(steady) * 1000
+        print(f"BENCH: {view}: {results[view]:.2f} мс/кадр, первый кадр {frame_times[0] * 1000:.0f} мс "
+              f"({n_pcs} ПК x {sensors_per_pc} датчиков)")
+    return results
+
+def run_remote(args):
+    """Просмотр ПК здания или комнаты по подписке на сервер"""
+    monitor = TemperatureMonitor(max_points=200)
+    feed = RemoteFeed(args.server, monitor, args.building, args.room)
+    
+    print(f"Подключение к {args.server}...")
+    feed_thread = threading.Thread(target=remote_collection_thread, args=(feed,))
+    feed_thread.daemon = True
+    feed_thread.start()
+    
+    plt.style.use('dark_background')
+    title = f"Здание {args.building}" + (f", комната {args.room}" if args.room is not None else "")
+    if args.view == 'multiples':
+        fig = plt.figure(figsize=(16, 10))
+        fig.suptitle(title)
+        plot = SmallMultiplesPlot(fig, monitor, window=args.window)
+    else:
+        fig, ax = setup_plot()
+        ax.set_title(title)
+        if args.view == 'heatmap':
+            plot = HeatmapPlot(fig, ax, monitor, window=args.window)
+        else:
+            plot = LivePlot(fig, ax, monitor)
+    
+    try:
+        timer = fig.canvas.new_timer(interval=1000)
+        timer.add_callback(plot.update)
+        timer.start()
+        plt.show()
+    except KeyboardInterrupt:
+        print("\nПрограмма прервана пользователем.")
+    finally:
+        monitor.running = False
+        avg_ms, max_ms = plot.frame_time_stats()
+        print(f"Уведомлений: {feed.notifications}, время кадра: среднее {avg_ms:.1f} мс, максимум {max_ms:.1f} мс")
+
 def main():
+    parser = argparse.ArgumentParser(description="График температуры датчиков в реальном времени")
+    parser.add_argument('--mode', choices=('blit', 'legacy'), default='blit',
+                        help="blit - постоянные линии и блиттинг, legacy - полная перерисовка кадра")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="замер времени кадра без окна и датчиков")
+    parser.add_argument('--server', help="URL OPC UA сервера: просмотр ПК здания или комнаты вместо этого ПК")
+    parser.add_argument('--building', type=int, default=1)
+    parser.add_argument('--room', type=int, help="комната (по умолчанию - все здание)")
+    parser.add_argument('--view', choices=('heatmap', 'multiples', 'lines'), default='heatmap',
+                        help="вид для удаленного режима")
+    parser.add_argument('--window', type=float, default=600, help="видимый интервал удаленного режима, с")
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        benchmark_rendering()
+        benchmark_fleet()
+        return
+    
+    if args.server:
+        run_remote(args)
+        return
+    
     print("Инициализация OpenHardwareMonitor...")
     HardwareHandle = initialize_openhardwaremonitor()
     
     print("Создание монитора температуры...")
-    monitor = TemperatureMonitor(max_points=200)  # Храним последние 200 точек
+    monitor = TemperatureMonitor(max_points=200)  # 200 последних точек целиком, более старые - прореженно
     
     print("Запуск сбора данных...")
     # Запускаем поток для сбора данных
@@ -178,11 +799,18 @@ def main():
     
     # Настройка и запуск графика
     fig, ax = setup_plot()
+    plot = None
     
     try:
-        # Анимация обновляется каждые 1000мс (1 секунда)
-        ani = animation.FuncAnimation(fig, animate, fargs=(ax, monitor), 
-                                    interval=1000, blit=False, cache_frame_data=False)
+        # Кадр обновляется каждые 1000мс (1 секунда)
+        if args.mode == 'blit':
+            plot = LivePlot(fig, ax, monitor)
+            timer = fig.canvas.new_timer(interval=1000)
+            timer.add_callback(plot.update)
+            timer.start()
+        else:
+            ani = animation.FuncAnimation(fig, animate, fargs=(ax, monitor), 
+                                        interval=1000, blit=False, cache_frame_data=False)
         
         plt.show()
         
@@ -190,6 +818,10 @@ def main():
         print("\nПрограмма прервана пользователем.")
     finally:
         monitor.running = False
+        if plot:
+            avg_ms, max_ms = plot.frame_time_stats()
+            print(f"Время кадра: среднее {avg_ms:.1f} мс, максимум {max_ms:.1f} мс, "
+                  f"полных перерисовок {plot.full_redraws}")
         print("Завершение работы...")
 
 if __name__ == "__main__":